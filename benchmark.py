@@ -0,0 +1,265 @@
+###############################################################################
+#  Benchmarks - times every stage of the interpreter on synthetic programs.   #
+#                                                                             #
+#  $ python benchmark.py --json results.json                                  #
+#  $ python benchmark.py --compare results.json                               #
+#                                                                             #
+###############################################################################
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from interpreter import __version__
+from interpreter.lexical_analysis.lexer import Lexer
+from interpreter.interpreter.interpreter import Interpreter, VISIT, CLOSURE, JIT_MODE
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+
+HEADER = ["\n", "synthetic:     format de fichier elf64-x86-64\n", "\n", "\n",
+          "Déassemblage de la section .text :\n", "\n"]
+START = 0x401000
+STAGES = ['lexer', 'parser', 'analyzer', 'interpreter']
+
+
+class Workload():
+    """ A synthetic disassembly: its lines, the functions to load from it
+    and the value its main function returns.
+    """
+    def __init__(self, name, size, lines, functions, expected):
+        self.name = name
+        self.size = size
+        self.lines = lines
+        self.functions = functions
+        self.expected = expected
+
+
+class Assembler():
+    """ Writes objdump-like sections, one instruction every 4 bytes. """
+    def __init__(self):
+        self.lines = list(HEADER)
+        self.pc = START
+        self.functions = []
+        self.addresses = {}
+
+    def function(self, name, instructions):
+        """ Adds a function, `instructions` being a callable mapping the
+        address of each of its instructions to their text.
+        """
+        self.pc = (self.pc + 15) & ~15
+        self.functions.append(name)
+        self.addresses[name] = self.pc
+        self.lines.append("%016x <%s>:\n" % (self.pc, name))
+        for text in instructions(self.pc):
+            self.lines.append("  %x:\t%-21s\t%s\n" % (self.pc, "90", text))
+            self.pc += 4
+        self.lines.append("\n")
+
+
+def many_functions(count):
+    """ `count` small functions, each called once by main. """
+    asm = Assembler()
+    for number in range(count):
+        asm.function("f%d" % number, lambda pc: [
+            "push   %rbp", "mov    %rsp,%rbp", "add    $0x1,%rax",
+            "pop    %rbp", "retq   ",
+        ])
+    calls = ["callq  %x <f%d>" % (asm.addresses["f%d" % number], number)
+             for number in range(count)]
+    asm.function("main", lambda pc: ["mov    $0x0,%rax"] + calls + ["retq   "])
+    return Workload('functions', count, asm.lines, asm.functions, count)
+
+
+def straight_line(count):
+    """ A main function of about `count` instructions without any jump. """
+    rounds = max(1, count // 5)
+    body = ["add    $0x3,%rax", "mov    %rax,%rbx", "sub    $0x1,%rbx",
+            "mov    %rbx,-0x8(%rbp)", "mov    -0x8(%rbp),%rax"] * rounds
+    asm = Assembler()
+    asm.function("main", lambda pc: ["push   %rbp", "mov    %rsp,%rbp",
+                                     "mov    $0x0,%rax"] + body +
+                 ["pop    %rbp", "retq   "])
+    return Workload('straight_line', count, asm.lines, asm.functions, 2 * rounds)
+
+
+def recursion(depth):
+    """ A function summing the integers up to `depth` by recursing on each. """
+    asm = Assembler()
+    asm.function("sum", lambda pc: [
+        "push   %rbp", "mov    %rsp,%rbp", "push   %rbx", "mov    %rdi,%rbx",
+        "mov    $0x0,%rax", "cmp    $0x0,%rbx", "jle    %x <sum+0x2c>" % (pc + 0x2c),
+        "mov    %rbx,%rdi", "sub    $0x1,%rdi", "callq  %x <sum>" % pc,
+        "add    %rbx,%rax", "pop    %rbx", "pop    %rbp", "retq   ",
+    ])
+    target = asm.addresses["sum"]
+    asm.function("main", lambda pc: [
+        "push   %rbp", "mov    %rsp,%rbp", "mov    $0x%x,%%rdi" % depth,
+        "callq  %x <sum>" % target, "pop    %rbp", "retq   ",
+    ])
+    return Workload('recursion', depth, asm.lines, asm.functions, depth * (depth + 1) // 2)
+
+
+def tight_loop(iterations):
+    """ A four instructions loop summing the integers up to `iterations`. """
+    asm = Assembler()
+    asm.function("main", lambda pc: [
+        "mov    $0x0,%rax", "mov    $0x%x,%%rcx" % iterations,
+        "add    %rcx,%rax", "sub    $0x1,%rcx", "cmp    $0x0,%rcx",
+        "jg     %x <main+0x8>" % (pc + 8), "retq   ",
+    ])
+    return Workload('tight_loop', iterations, asm.lines, asm.functions,
+                    iterations * (iterations + 1) // 2)
+
+
+def stages(workload, mode, counting=False):
+    """ Runs every stage once. Returns their durations, the interpreter and
+    the value returned.
+    """
+    timings = {}
+    start = time.perf_counter()
+    lexer = Lexer(workload.lines, workload.functions)
+    timings['lexer'] = time.perf_counter() - start
+    start = time.perf_counter()
+    tree = Parser(lexer).parse()
+    timings['parser'] = time.perf_counter() - start
+    start = time.perf_counter()
+    SemanticAnalyzer.analyze(tree)
+    timings['analyzer'] = time.perf_counter() - start
+    interpreter = Interpreter([], mode=mode, counting=counting)
+    start = time.perf_counter()
+    result = interpreter.interpret(tree)
+    timings['interpreter'] = time.perf_counter() - start
+    return timings, interpreter, result
+
+
+def reset_peak():
+    """ Starts measuring a new peak, which tracemalloc only allows from
+    Python 3.9: the peaks are otherwise the highest since the first stage.
+    """
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+
+def peak_memory(workload, mode):
+    """ Peak traced allocations of every stage, in bytes. """
+    peaks = {}
+    tracemalloc.start()
+    try:
+        lexer = Lexer(workload.lines, workload.functions)
+        peaks['lexer'] = tracemalloc.get_traced_memory()[1]
+        reset_peak()
+        tree = Parser(lexer).parse()
+        peaks['parser'] = tracemalloc.get_traced_memory()[1]
+        reset_peak()
+        SemanticAnalyzer.analyze(tree)
+        peaks['analyzer'] = tracemalloc.get_traced_memory()[1]
+        reset_peak()
+        Interpreter([], mode=mode).interpret(tree)
+        peaks['interpreter'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def measure(workload, mode, repeat, memory):
+    """ The results of a workload: the best time of every stage over
+    `repeat` runs, the instructions per second and the peak memory.
+    """
+    _, interpreter, result = stages(workload, mode, counting=True)
+    if result != workload.expected:
+        raise RuntimeError("%s returned %s instead of %s"
+                           % (workload.name, result, workload.expected))
+    best = {}
+    for _ in range(repeat):
+        timings, _, _ = stages(workload, mode)
+        for stage in STAGES:
+            best[stage] = min(best.get(stage, timings[stage]), timings[stage])
+    return {
+        'name': workload.name,
+        'size': workload.size,
+        'lines': len(workload.lines),
+        'instructions': interpreter.executed,
+        'seconds': best,
+        'instructions_per_second': interpreter.executed / best['interpreter'],
+        'peak_memory': peak_memory(workload, mode) if memory else None,
+    }
+
+
+def commit():
+    """ The commit being measured, if run from a git checkout. """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, previous=None):
+    """ Prints the results, with the ratio to `previous` ones if given. """
+    before = {}
+    if previous is not None:
+        before = {result['name']: result for result in previous['workloads']}
+    for result in results['workloads']:
+        print("{name} (size {size}, {instructions} instructions, "
+              "{instructions_per_second:.0f} instructions/s)".format(**result))
+        old = before.get(result['name'])
+        for stage in STAGES:
+            line = "  {:<12}{:>10.4f}s".format(stage, result['seconds'][stage])
+            if result['peak_memory'] is not None:
+                line += "{:>10.1f} MB".format(result['peak_memory'][stage] / 2**20)
+            if old is not None and old['size'] == result['size']:
+                line += "{:>8.2f}x".format(result['seconds'][stage] / old['seconds'][stage])
+            print(line)
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Time the stages of the interpreter on synthetic programs.'
+    )
+    argparser.add_argument('--functions', type=int, default=2000,
+                           help='Number of functions of the many functions workload')
+    argparser.add_argument('--straight', type=int, default=20000,
+                           help='Number of instructions of the straight-line workload')
+    argparser.add_argument('--depth', type=int, default=5000,
+                           help='Depth of the recursion workload')
+    argparser.add_argument('--iterations', type=int, default=100000,
+                           help='Number of iterations of the tight loop workload')
+    argparser.add_argument('--mode', choices=[VISIT, CLOSURE, JIT_MODE], default=CLOSURE,
+                           help='Execution mode of the interpreter')
+    argparser.add_argument('--repeat', type=int, default=3,
+                           help='Runs of every workload, the best one being kept')
+    argparser.add_argument('--no-memory', action='store_true',
+                           help='Skip the traced run measuring the peak memory')
+    argparser.add_argument('--json', help='File to write the results to')
+    argparser.add_argument('--compare', help='Results of a previous run to compare with')
+    args = argparser.parse_args()
+
+    workloads = [
+        many_functions(args.functions),
+        straight_line(args.straight),
+        recursion(args.depth),
+        tight_loop(args.iterations),
+    ]
+    results = {
+        'version': __version__,
+        'commit': commit(),
+        'python': platform.python_version(),
+        'mode': args.mode,
+        'workloads': [measure(workload, args.mode, args.repeat, not args.no_memory)
+                      for workload in workloads],
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as stream:
+            previous = json.load(stream)
+    report(results, previous)
+    if args.json:
+        with open(args.json, 'w') as stream:
+            json.dump(results, stream, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,10 +8,13 @@ import argparse
 import textwrap
 import sys
 
-from interpreter.lexical_analysis.lexer import Lexer, SectionLexer
+from interpreter.lexical_analysis.lexer import Lexer
 from interpreter.interpreter.interpreter import Interpreter
-from interpreter.syntax_analysis.parser import Parser
+from interpreter.interpreter.trace import TraceRecorder
+from interpreter.syntax_analysis.parser import Parser, parse_parallel
 from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from interpreter.utils.cache import ProgramCache, CACHE_DIR
+from interpreter.utils.loader import Loader
 #from interpreter.syntax_analysis.tree import NodeVisitor
 
 
@@ -337,6 +340,25 @@ from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
 #
 
 
+def run(tree, args, loader=None):
+    """ Interprets a program, reporting its profile and recording its trace
+    if asked.
+    """
+    recorder = TraceRecorder(args.trace) if args.trace else None
+    interpreter = Interpreter([], loader=loader, profile=args.profile is not None,
+                              recorder=recorder)
+    try:
+        status = interpreter.interpret(tree)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    if interpreter.profiler is not None:
+        sys.stderr.write(interpreter.profiler.report() + "\n")
+        if args.profile:
+            interpreter.profiler.write_collapsed(args.profile)
+    return status
+
+
 def main():
     argparser = argparse.ArgumentParser(
         description='Generate an AST DOT file.'
@@ -345,11 +367,53 @@ def main():
         'fname',
         help='Pascal source file'
     )
+    front_end = argparser.add_mutually_exclusive_group()
+    front_end.add_argument(
+        '--cache',
+        nargs='?',
+        const=CACHE_DIR,
+        help='Directory caching the checked programs'
+    )
+    front_end.add_argument(
+        '--jobs',
+        type=int,
+        default=0,
+        help='Lex and parse the sections across JOBS processes'
+    )
+    front_end.add_argument(
+        '--lazy',
+        action='store_true',
+        help='Only load the functions main reaches, when it reaches them'
+    )
+    argparser.add_argument(
+        '--profile',
+        nargs='?',
+        const='',
+        help='Report the hot spots, and write the collapsed stacks to PROFILE if given'
+    )
+    argparser.add_argument(
+        '--trace',
+        help='Record the executed instructions and their writes to TRACE'
+    )
     args = argparser.parse_args()
     fname = args.fname
-    text = open(fname, 'r').readlines()
-
-    lexer = Lexer(text, ["main"])
+    if args.lazy:
+        loader = Loader(fname)
+        tree = loader.reachable('main')
+        print(run(tree, args, loader))
+        return
+    if args.jobs:
+        with open(fname, 'r') as text:
+            tree = parse_parallel(text, ["main"], workers=args.jobs)
+        SemanticAnalyzer.analyze(tree)
+        print(run(tree, args))
+        return
+    if args.cache:
+        tree = ProgramCache(args.cache).program(fname, ["main"])
+        print(run(tree, args))
+        return
+    with open(fname, 'r') as text:
+        lexer = Lexer(text, ["main"])
     #print(lexer)
     #for section in lexer.sections:
     #    print(section)
@@ -366,7 +430,7 @@ def main():
     #viz = ASTVisualizer(parser)
     #content = viz.gendot()
     #print(content)
-    status = Interpreter([]).interpret(tree)
+    status = run(tree, args)
     print(status)
 
 
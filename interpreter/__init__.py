@@ -1,3 +1,5 @@
+__version__ = "0.1.0"
+
 from . import utils
 from . import lexical_analysis
 from . import syntax_analysis
@@ -1,3 +1,7 @@
 # -*- coding:utf8 -*-
 from . import memory
 from . import interpreter
+from . import batch
+from . import trace
+from . import history
+from . import session
@@ -0,0 +1,115 @@
+# -*- coding:utf8 -*-
+"""
+Runs many programs, or one program on many inputs, across processes.
+
+Each job names a disassembly, the function to run and the registers and
+memory to start from. Jobs are fanned out over a process pool; every worker
+keeps the disassemblies it has already read, loading their functions on
+demand, so that the jobs sharing a program only pay for its front end once
+per worker. Only the LOADERS most recently used disassemblies are kept, and
+a file changed on disk is read again. Results are yielded as the jobs
+complete. A job can be bounded in instructions and in time, so that a
+runaway program stops instead of holding its worker.
+"""
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ..utils.loader import Loader
+from .interpreter import Interpreter, CLOSURE
+from .memory import SLOTS, PAGE_SHIFT
+
+LOADERS = 8
+
+_loaders = OrderedDict()
+
+
+class Job():
+    """ A run of the function `entry` of the disassembly `fname`, starting
+    from the `registers` (name to value) and `memory` (address to bytes)
+    given, for at most `max_instructions` frames and `timeout` seconds.
+    `keep_state` asks for the final registers and memory.
+    """
+    def __init__(self, fname, entry='main', registers=None, memory=None, keep_state=False,
+                 max_instructions=None, timeout=None):
+        self.fname = fname
+        self.entry = entry
+        self.registers = registers or {}
+        self.memory = memory or {}
+        self.keep_state = keep_state
+        self.max_instructions = max_instructions
+        self.timeout = timeout
+
+
+class Result():
+    """ The outcome of the job at position `job` of the batch: why it
+    stopped (the end, its budget or its timeout), the value of rax at the
+    end and the number of instructions executed, or the error which stopped
+    it. `registers` and `memory` hold the final state if it was asked for,
+    the memory as its non-empty pages by address.
+    """
+    def __init__(self, job, reason=None, rax=None, executed=0, error=None, registers=None,
+                 memory=None):
+        self.job = job
+        self.reason = reason
+        self.rax = rax
+        self.executed = executed
+        self.error = error
+        self.registers = registers
+        self.memory = memory
+
+    def __repr__(self):
+        if self.error is not None:
+            return "Result(job={}, error={!r})".format(self.job, self.error)
+        return "Result(job={}, {}, rax={}, executed={})".format(
+            self.job, self.reason, self.rax, self.executed)
+
+
+def loader(fname):
+    """ The loader of the disassembly `fname`, read once per process as long
+    as the file does not change and stays among the LOADERS most recently
+    used.
+    """
+    stat = os.stat(fname)
+    key = (os.path.abspath(fname), stat.st_mtime_ns, stat.st_size)
+    functions = _loaders.get(key)
+    if functions is not None:
+        _loaders.move_to_end(key)
+        return functions
+    functions = _loaders[key] = Loader(fname)
+    while len(_loaders) > LOADERS:
+        _loaders.popitem(last=False)
+    return functions
+
+
+def run_job(position, job, mode=CLOSURE):
+    """ Runs a job in the current process. """
+    try:
+        functions = loader(job.fname)
+        tree = functions.reachable(job.entry)
+        interpreter = Interpreter([], mode=mode, loader=functions)
+        memory = interpreter.memory
+        for name, value in job.registers.items():
+            memory.registers[name] = value
+        for address, data in job.memory.items():
+            memory.stack.write(address, data)
+        interpreter.start(tree, job.entry)
+        stop = interpreter.run(job.max_instructions, job.timeout)
+    except Exception as message:
+        return Result(position, error="[{}] {}".format(type(message).__name__, message))
+    result = Result(position, stop.reason, stop.result, stop.executed)
+    if job.keep_state:
+        result.registers = {name: memory.registers[name] for name in SLOTS}
+        result.memory = {number << PAGE_SHIFT: bytes(page)
+                         for number, page in memory.stack.pages.items() if any(page)}
+    return result
+
+
+def run_batch(jobs, workers=None, mode=CLOSURE):
+    """ Runs `jobs` across `workers` processes (as many as CPUs by default),
+    yielding their results in completion order.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_job, position, job, mode)
+                   for position, job in enumerate(jobs)]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,342 @@
+# -*- coding:utf8 -*-
+"""
+Compiles the frames of the program image into Python closures.
+
+Each closure has its opcode, operand kinds and register names baked in when
+it is built, and returns the index of the next frame to execute. Falling
+off the program gives `len(program)`, the index of the `end` sentinel, and a
+return from the entry function calls `interpreter.end()`; both raise
+EndOfExecution. Instructions whose semantics are not handled here fall
+back to the interpreter's visitor. Values are plain ints, masked to the
+width of their destination when written.
+"""
+import operator
+from .memory import Registers
+from .operand import REGISTER, IMMEDIATE, INDIRECT
+from .number import compare, signed
+from ..lexical_analysis.token_type import ADD_OP, ADDL_OP, SUB_OP, AND_OP, XOR_OP
+from ..lexical_analysis.token_type import SHL_OP, SHR_OP, MUL_OP, LEA_OP, TEST
+from ..lexical_analysis.token_type import NOT_OP, NEG_OP, DEC_OP, INC_OP
+from ..lexical_analysis.token_type import JL, JG, JGE, JLE, JE, JNE, JMP, JMPQ
+from ..lexical_analysis.token_type import PUSH, PUSHQ
+from ..syntax_analysis.tree import NodeVisitor
+
+OPERATORS = {
+    ADD_OP: operator.add,
+    ADDL_OP: operator.add,
+    SUB_OP: operator.sub,
+    AND_OP: operator.and_,
+    XOR_OP: operator.xor,
+    SHL_OP: operator.lshift,
+    SHR_OP: operator.rshift,
+    MUL_OP: operator.mul,
+}
+
+UNARY_OPERATORS = {
+    NOT_OP: lambda value, _: ~value,
+    NEG_OP: lambda value, _: -value,
+    DEC_OP: lambda value, _: value - 1,
+    INC_OP: lambda value, _: value + 1,
+}
+
+
+class Compiler(NodeVisitor):
+    """ Turns every frame of the program image into a closure. """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.memory = interpreter.memory
+        self.frame = None
+
+    def compile(self, program):
+        """ Returns the list of closures, indexed like the program image. """
+        return [self.visit(frame) for frame in program]
+
+    def generic_visit(self, node):
+        return self.fallback(self.frame)
+
+    def fallback(self, frame):
+        """ Executes the frame through the interpreter's visitor. """
+        interpreter = self.interpreter
+        visit = interpreter.visit
+        next_index = frame.next_index
+
+        def run():
+            interpreter.frame = frame
+            interpreter.next_index = next_index
+            visit(frame)
+            return interpreter.next_index
+        return run
+
+    def visit_Frame(self, node):
+        self.frame = node
+        return self.visit(node.instr)
+
+    ###########################################################################
+    #  Operands                                                               #
+    ###########################################################################
+
+    def register(self, name):
+        """ Reader of a register, masked against its canonical slot. """
+        slots = self.memory.registers._slots
+        slot, mask, shift, _ = Registers.view(name)
+        if shift:
+            return lambda: (slots[slot] >> shift) & mask
+        if mask.bit_length() < 64:
+            return lambda: slots[slot] & mask
+        return lambda: slots[slot]
+
+    def writer(self, operand):
+        """ Writer of a destination operand, masking the value to its width. """
+        if operand.kind == REGISTER:
+            slots = self.memory.registers._slots
+            slot, mask, shift, keep = Registers.view(operand.register)
+            if not keep:
+                def write(value):
+                    slots[slot] = value & mask
+            else:
+                def write(value):
+                    slots[slot] = (slots[slot] & keep) | ((value & mask) << shift)
+            return write
+        store = self.memory.stack.store
+        address = self.address(operand)
+        size = self.frame.size
+        return lambda value: store(address(), value, size)
+
+    def modifier(self, operand):
+        """ Applier of `destination = function(destination, other)`, reading
+        and writing the destination in place.
+        """
+        if operand.kind == REGISTER:
+            read = self.register(operand.register)
+            write = self.writer(operand)
+            return lambda function, other: write(function(read(), other))
+        load = self.memory.stack.load
+        store = self.memory.stack.store
+        address = self.address(operand)
+        size = self.frame.size
+
+        def modify(function, other):
+            target = address()
+            store(target, function(load(target, size), other), size)
+        return modify
+
+    def value(self, operand):
+        """ Reader of a source operand. """
+        if operand.kind == REGISTER:
+            return self.register(operand.register)
+        if operand.kind == IMMEDIATE:
+            immediate = operand.immediate
+            return lambda: immediate
+        if operand.kind == INDIRECT:
+            return self.value(operand.inner)
+        load = self.memory.stack.load
+        address = self.address(operand)
+        size = self.frame.size
+        return lambda: load(address(), size)
+
+    def address(self, operand):
+        """ Reader of the address a memory operand designates. """
+        displacement = operand.displacement
+        scale = operand.scale
+        if operand.base and operand.index:
+            base = self.register(operand.base)
+            index = self.register(operand.index)
+            return lambda: displacement + base() + scale * index()
+        if operand.base:
+            base = self.register(operand.base)
+            return lambda: displacement + base()
+        if operand.index:
+            index = self.register(operand.index)
+            return lambda: displacement + scale * index()
+        return lambda: displacement
+
+    ###########################################################################
+    #  Operations                                                             #
+    ###########################################################################
+
+    def visit_NullOp(self, node):
+        next_index = self.frame.next_index
+        return lambda: next_index
+
+    def visit_MovOp(self, node):
+        left, target = self.frame.operands
+        write = self.writer(target)
+        value = self.value(left)
+        next_index = self.frame.next_index
+
+        def run():
+            write(value())
+            return next_index
+        return run
+
+    def visit_BinOp(self, node):
+        memory = self.memory
+        next_index = self.frame.next_index
+        left, target = self.frame.operands
+        value = self.value(left)
+        ttype = node.op.type
+
+        if ttype == LEA_OP:
+            write = self.writer(target)
+            address = self.address(left)
+
+            def run():
+                write(address())
+                return next_index
+            return run
+
+        if ttype == TEST:
+            right = self.value(target)
+
+            def run():
+                memory.cmp_reg = int(right() & value())
+                return next_index
+            return run
+
+        function = OPERATORS.get(ttype)
+        if function is None:
+            return self.fallback(self.frame)
+        modify = self.modifier(target)
+
+        if ttype == MUL_OP:
+            def run():
+                modify(function, value())
+                return next_index
+            return run
+
+        def run():
+            other = value()
+            modify(function, other)
+            memory.cmp_reg = 0 if other == 0 else 1
+            return next_index
+        return run
+
+    def visit_TernOp(self, node):
+        if node.op.type != MUL_OP:
+            return self.fallback(self.frame)
+        left, middle, target = self.frame.operands
+        write = self.writer(target)
+        left = self.value(left)
+        middle = self.value(middle)
+        next_index = self.frame.next_index
+
+        def run():
+            write(left() * middle())
+            return next_index
+        return run
+
+    def visit_UnOp(self, node):
+        memory = self.memory
+        (target,) = self.frame.operands
+        modify = self.modifier(target)
+        value = self.value(target)
+        next_index = self.frame.next_index
+        function = UNARY_OPERATORS[node.op.type]
+
+        if node.op.type in [NOT_OP, NEG_OP]:
+            def run():
+                modify(function, None)
+                return next_index
+            return run
+
+        def run():
+            memory.cmp_reg = 0 if value() == 0 else 1
+            modify(function, None)
+            return next_index
+        return run
+
+    def visit_StackOp(self, node):
+        memory = self.memory
+        (operand,) = self.frame.operands
+        size = self.frame.size
+        next_index = self.frame.next_index
+
+        if node.op.type in [PUSH, PUSHQ]:
+            push = memory.push
+            value = self.value(operand)
+
+            def run():
+                push(value(), size)
+                return next_index
+            return run
+
+        write = self.writer(operand)
+        pop = memory.pop
+
+        def run():
+            write(pop(size))
+            return next_index
+        return run
+
+    def visit_CmpOp(self, node):
+        memory = self.memory
+        left, right = self.frame.operands
+        left = self.value(left)
+        right = self.value(right)
+        size = self.frame.size
+        next_index = self.frame.next_index
+
+        def run():
+            memory.cmp_reg = compare(signed(right(), size), signed(left(), size))
+            return next_index
+        return run
+
+    def visit_CallQOp(self, node):
+        index = self.frame.jump_index
+        if index is None:
+            return self.fallback(self.frame)
+        push = self.memory.push
+        call_stack = self.memory.call_stack
+        return_address = self.interpreter.return_address(self.frame)
+        next_index = self.frame.next_index
+
+        def run():
+            push(return_address)
+            call_stack.append(next_index)
+            return index
+        return run
+
+    def visit_RetStmt(self, node):
+        pop = self.memory.pop
+        call_stack = self.memory.call_stack
+        end = self.interpreter.end
+
+        def run():
+            if not call_stack:
+                end()
+            pop()
+            return call_stack.pop()
+        return run
+
+    def visit_JmpStmt(self, node):
+        memory = self.memory
+        index = self.frame.jump_index
+        next_index = self.frame.next_index
+        if index is None:
+            return self.fallback(self.frame)
+        if node.op.type in [JMP, JMPQ]:
+            return lambda: index
+        ttype = node.op.type
+
+        if ttype == JG:
+            def run():
+                return index if memory.cmp_reg == 2 else next_index
+        elif ttype == JGE:
+            def run():
+                return index if memory.cmp_reg >= 1 else next_index
+        elif ttype == JE:
+            def run():
+                return index if memory.cmp_reg == 0 else next_index
+        elif ttype == JNE:
+            def run():
+                return index if memory.cmp_reg != 0 else next_index
+        elif ttype == JLE:
+            def run():
+                return index if memory.cmp_reg <= -1 else next_index
+        elif ttype == JL:
+            def run():
+                return index if memory.cmp_reg == -2 else next_index
+        else:
+            return lambda: next_index
+        return run
@@ -0,0 +1,195 @@
+# -*- coding:utf8 -*-
+"""
+Time travel through the execution of a program.
+
+The program is executed one frame at a time. Every step logs what it
+undoes: the previous values of the registers and memory it wrote, of the
+comparison flag and of the top of the call stack. A checkpoint, a
+copy-on-write snapshot of the machine state, is taken every `interval`
+steps, and the undo log only covers the steps since the last one. Going
+back within the current interval applies the undo log; going further
+restores the nearest checkpoint and replays forward from it. Moving to any
+step thus costs at most one interval of steps, whatever the length of the
+execution.
+
+Breakpoints stop the execution once their frame has run, as the traps of
+the interpreter do. The program image must not change while travelling, so
+functions cannot be loaded lazily during the execution.
+"""
+from array import array
+from .interpreter import END
+from .memory import SLOTS
+
+
+class History():
+    """ The execution of the function `entry` of a program by `interpreter`,
+    which can be moved forward and backward. `break_points` are addresses
+    `continue_` and `reverse_continue` stop at, right after executing them.
+    """
+    def __init__(self, interpreter, tree, entry='main', interval=1024, break_points=()):
+        if interpreter.loader is not None:
+            raise ValueError("Functions cannot be loaded lazily while travelling in time")
+        self.interpreter = interpreter
+        self.memory = interpreter.memory
+        self.interval = interval
+        self.break_points = set(break_points)
+        self.step = 0
+        self.done = False
+        self.checkpoints = []
+        self.undo = []
+        self.writes = None
+        self.load = self.memory.stack.load
+        self.store = self.memory.stack.store
+        self.memory.stack.store = self.logged_store
+        interpreter.single_step = True
+        interpreter.start(tree, entry)
+        self.checkpoint()
+
+    def logged_store(self, address, value, size):
+        self.writes.append((address, self.load(address, size), size))
+        self.store(address, value, size)
+
+    @property
+    def index(self):
+        """ Index of the frame about to be executed. """
+        return self.interpreter.index
+
+    @index.setter
+    def index(self, index):
+        self.interpreter.index = index
+        self.interpreter.stop = None
+
+    @property
+    def prog_counter(self):
+        """ Address of the frame about to be executed, None at the end. """
+        if self.done or self.index >= len(self.memory.program):
+            return None
+        return self.memory.program[self.index].prog_counter
+
+    def checkpoint(self):
+        """ Starts a new interval: takes its checkpoint if it is the first
+        time it is reached, and empties the undo log.
+        """
+        if self.step == len(self.checkpoints) * self.interval:
+            self.checkpoints.append((self.memory.snapshot(), self.index))
+        self.undo = []
+
+    def advance(self):
+        """ Executes one frame, logging how to undo it. Returns False at the
+        end of the execution.
+        """
+        if self.done:
+            return False
+        memory = self.memory
+        slots = memory.registers._slots
+        call_stack = memory.call_stack
+        before = array('Q', slots)
+        flag = memory.cmp_reg
+        depth = len(call_stack)
+        top = call_stack[-1] if call_stack else None
+        self.writes = []
+        index = self.index
+        if self.interpreter.step().reason == END:
+            self.done = True
+            return False
+        registers = ()
+        if slots != before:
+            registers = [(slot, before[slot]) for slot in range(len(SLOTS))
+                         if slots[slot] != before[slot]]
+        self.undo.append((index, registers, flag, self.writes, depth, top))
+        self.step += 1
+        if self.step % self.interval == 0:
+            self.checkpoint()
+        return True
+
+    def retreat(self):
+        """ Undoes the last step, which must be in the undo log. """
+        index, registers, flag, writes, depth, top = self.undo.pop()
+        memory = self.memory
+        slots = memory.registers._slots
+        for slot, value in registers:
+            slots[slot] = value
+        memory.cmp_reg = flag
+        for address, value, size in reversed(writes):
+            self.store(address, value, size)
+        call_stack = memory.call_stack
+        del call_stack[max(depth - 1, 0):]
+        if depth:
+            call_stack.append(top)
+        self.index = index
+        self.step -= 1
+        self.done = False
+
+    def seek(self, step):
+        """ Moves to the state before the execution of the step `step`, or to
+        the end of the execution if it stops earlier. The nearest checkpoint
+        is restored unless the step is reached faster from the current one.
+        """
+        step = max(step, 0)
+        number = min(step // self.interval, len(self.checkpoints) - 1)
+        if step < self.step - len(self.undo) or number * self.interval > self.step:
+            snapshot, index = self.checkpoints[number]
+            self.memory.restore(snapshot)
+            self.index = index
+            self.step = number * self.interval
+            self.done = False
+            self.undo = []
+        while self.step > step:
+            self.retreat()
+        while self.step < step and self.advance():
+            pass
+        return self.step
+
+    def forward(self, count=1):
+        """ Executes `count` steps, stopping earlier after a breakpoint or at
+        the end of the execution. Returns the number of steps executed.
+        """
+        start = self.step
+        while count is None or self.step - start < count:
+            executed = self.prog_counter
+            if not self.advance():
+                break
+            if executed in self.break_points:
+                break
+        return self.step - start
+
+    def back(self, count=1):
+        """ Goes back `count` steps. Returns the number of steps undone. """
+        start = self.step
+        return start - self.seek(start - count)
+
+    def continue_(self):
+        """ Executes until a breakpoint or the end of the execution. """
+        return self.forward(None)
+
+    def reverse_continue(self):
+        """ Goes back to the last step following a breakpoint, before the
+        current one, or to the beginning of the execution. Returns the step
+        reached.
+        """
+        current = self.step
+        start = current - len(self.undo)
+        for step in range(current - 2, start - 1, -1):
+            if self.prog_counter_at(self.undo[step - start][0]) in self.break_points:
+                return self.seek(step + 1)
+        while start > 0:
+            start -= self.interval
+            self.seek(start)
+            found = None
+            while self.step < start + self.interval and self.step + 1 < current:
+                executed = self.prog_counter
+                if not self.advance():
+                    break
+                if executed in self.break_points:
+                    found = self.step
+            if found is not None:
+                return self.seek(found)
+        return self.seek(0)
+
+    def prog_counter_at(self, index):
+        return self.memory.program[index].prog_counter
+
+    @property
+    def result(self):
+        """ The value returned, once the execution is over. """
+        return self.memory.registers['rax'] if self.done else None
@@ -1,8 +1,10 @@
 # -*- coding:utf8 -*-
 from queue import Queue
-from copy import deepcopy
 from .memory import *
-from .number import Number
+from .number import compare, signed
+from .compiler import Compiler
+from .jit import JIT
+from .profiler import Profiler
 from ..lexical_analysis.lexer import Lexer
 from ..lexical_analysis.token_type import *
 from ..syntax_analysis.parser import Parser
@@ -10,29 +12,75 @@ from ..syntax_analysis.tree import *
 from ..semantic_analysis.analyzer import SemanticAnalyzer
 from ..utils.utils import MessageColor
 import sys
+import time
 
 AsmQueue = Queue()
 
+VISIT, CLOSURE, JIT_MODE = "VISIT", "CLOSURE", "JIT"
+
+END, BUDGET, TIMEOUT = "end", "budget", "timeout"
+BREAKPOINT, UNTIL = "breakpoint", "until"
+
+CLOCK_ENTRIES = 1024
+
 class EndOfExecution(BaseException):
     pass
 
+
+class Stop():
+    """ Why `run` or `step` returned: the END of the execution, the
+    instruction BUDGET spent, the TIMEOUT expired, a BREAKPOINT executed or
+    the address to run UNTIL reached. `executed` frames were
+    executed by the call and `prog_counter` is the address of the next one,
+    None at the end; `result` holds rax at the end.
+    """
+    def __init__(self, reason, executed, prog_counter, result=None):
+        self.reason = reason
+        self.executed = executed
+        self.prog_counter = prog_counter
+        self.result = result
+
+    def __repr__(self):
+        pc = "None" if self.prog_counter is None else "0x%x" % self.prog_counter
+        return "Stop({}, executed={}, {})".format(self.reason, self.executed, pc)
+
+
 class Interpreter(NodeVisitor):
 
-    def __init__(self, break_points, event):
+    def __init__(self, break_points, event=None, mode=VISIT, loader=None, counting=False,
+                 profile=False, recorder=None):
         self.memory = Memory()
-        self.break_points = break_points
-        self.cmp_reg = 0
+        self.break_points = set(break_points)
+        self.mode = mode
+        self.loader = loader
+        self.counting = counting
+        self.executed = 0
+        self.code = []
+        self.weights = []
+        self.stepping = None
+        self.stepping_weights = []
+        self.index = None
+        self.stop = None
+        self.profiler = Profiler(self) if profile else None
+        self.recorder = recorder
+        self.single_step = recorder is not None
+        if self.recorder is not None:
+            self.recorder.attach(self)
         self.frame = None
-        self.jmpd = False
+        self.next_index = None
         self.can_run = event
-        self.can_run.set()
+        if self.can_run is not None:
+            self.can_run.set()
 
     def preload_functions(self, tree):
         for child in tree.children:
-            frame = FunctionFrame(child)
-            self.memory.functions[child.name.value] = frame
-            self.memory.ranges[frame.boundaries] = child.name
+            self.add_function(child)
+        if self.loader is not None:
+            for break_point in self.break_points:
+                if break_point not in self.memory.frames and self.loader.load(break_point):
+                    self.add_loaded_functions()
         self.memory._create_frames()
+        self.memory._create_boundaries()
         if not self.memory._check(self.break_points):
             sys.stderr.write(str(["0x%08x" % key for key in
                                   self.memory.frames.keys()]) + '\n')
@@ -42,257 +90,419 @@ class Interpreter(NodeVisitor):
             sys.stderr.flush()
             raise Exception("Breakpoints are not all in the frames")
 
-    def visit_Register(self, node):
-        reg = self.memory.registers[node.value]
-        return Number(node.value[0], reg, register=node.value)
+    def add_function(self, section):
+        frame = FunctionFrame(section)
+        self.memory.functions[section.name.value] = frame
+        self.memory.ranges[frame.boundaries] = section.name
+
+    def add_loaded_functions(self):
+        """ Adds the functions loaded since the last call. Returns whether
+        there were any.
+        """
+        sections = [section for section in self.loader.program().children
+                    if section.name.value not in self.memory.functions]
+        for section in sections:
+            self.add_function(section)
+        return bool(sections)
+
+    def link(self, address):
+        """ Loads the function containing `address` during the execution:
+        the program image is rebuilt with it, and the code being executed
+        is recompiled in place. The indexes held by the call stack are
+        moved to the new image.
+        """
+        if not self.loader.load(address) or not self.add_loaded_functions():
+            return False
+        program = self.memory.program
+        returns = [program[index].prog_counter if index < len(program) else None
+                   for index in self.memory.call_stack]
+        self.memory._create_frames()
+        self.memory._create_boundaries()
+        program = self.memory.program
+        self.memory.call_stack[:] = [len(program) if pc is None else self.memory.indexes[pc]
+                                     for pc in returns]
+        self.compile(program, self.code)
+        return True
 
     def visit_Frame(self, node):
         self.visit(node.instr)
 
     def visit_UnOp(self, node):
-        node.operand.pointer = True
+        (operand,) = self.frame.operands
         if node.op.type == NOT_OP:
-            self.memory.inot(self.visit(node.operand))
+            self.memory.inot(operand, self.frame.size)
         if node.op.type == NEG_OP:
-            self.memory.ineg(self.visit(node.operand))
+            self.memory.ineg(operand, self.frame.size)
         if node.op.type == DEC_OP:
-            value = self.visit(node.operand)
-            self.memory.idec(value)
+            value = self.memory.value(operand, self.frame.size)
+            self.memory.idec(operand, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == INC_OP:
-            value = self.visit(node.operand)
-            self.memory.iinc(value)
+            value = self.memory.value(operand, self.frame.size)
+            self.memory.iinc(operand, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
 
 
     def visit_BinOp(self, node):
-        node.right.pointer = False
-        node.left.pointer = True
+        left, right = self.frame.operands
         if node.op.type in [ADD_OP, ADDL_OP]:
-            value = self.visit(node.left).value
-            self.memory.iadd(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.iadd(right, value, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == LEA_OP:
-            node.right.pointer = False
-            node.left.pointer = False
-            addr = self.visit(node.right)
-            value = self.visit(node.left).value
-            self.memory[addr] = self.visit(node.left).value
+            self.memory.store(right, self.memory.address(left), self.frame.size)
         if node.op.type == MUL_OP:
-            value = self.visit(node.left).value
-            self.memory.imul(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.imul(right, value, self.frame.size)
         if node.op.type == SUB_OP:
-            value = self.visit(node.left).value
-            self.memory.isub(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.isub(right, value, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == AND_OP:
-            value = self.visit(node.left).value
-            self.memory.iand(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.iand(right, value, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == XOR_OP:
-            value = self.visit(node.left).value
-            self.memory.ixor(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.ixor(right, value, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == SHL_OP:
-            value = self.visit(node.left).value
-            self.memory.ishl(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.ishl(right, value, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == SHR_OP:
-            value = self.visit(node.left).value
-            self.memory.ishr(self.visit(node.right), value)
+            value = self.memory.value(left, self.frame.size)
+            self.memory.ishr(right, value, self.frame.size)
             if value == 0:
-                self.cmp_reg = 0
+                self.memory.cmp_reg = 0
             else:
-                self.cmp_reg = 1
+                self.memory.cmp_reg = 1
         if node.op.type == TEST:
-            right = self.visit(node.right).value
-            left = self.visit(node.left).value
-            self.cmp_reg = int(right & left)
+            value = self.memory.value(right, self.frame.size)
+            self.memory.cmp_reg = int(value & self.memory.value(left, self.frame.size))
 
     def visit_TernOp(self, node):
-        node.right.pointer = False
-        node.middle.pointer = True
-        node.left.pointer = True
+        left, middle, right = self.frame.operands
         if node.op.type in [MUL_OP]:
-            self.memory.mul(self.visit(node.right),
-                            self.visit(node.left).value,
-                            self.visit(node.middle).value,
+            self.memory.mul(right,
+                            self.memory.value(left, self.frame.size),
+                            self.memory.value(middle, self.frame.size),
+                            self.frame.size,
                             )
 
     def visit_XchgOp(self, node):
-        node.right.pointer = False
-        node.left.pointer = True
-        left = self.visit(node.right)
-        right = self.visit(node.left)
-        if left.register:
-            self.memory.registers[left.register] = right
-            if left.register.startswith('e'):
-                self.memory.registers['r' + left.register[1:]] = right
-        else:
-            self.stack[right.value] = left
-        if right.register:
-            self.memory.registers[right.register] = left
-            if right.register.startswith('e'):
-                self.memory.registers['r' + right.register[1:]] = left
-        else:
-            self.stack[right.value] = left
+        left, right = self.frame.operands
+        value = self.memory.value(left, self.frame.size)
+        self.memory.store(left, self.memory.value(right, self.frame.size), self.frame.size)
+        self.memory.store(right, value, self.frame.size)
 
 
     def visit_MovOp(self, node):
-        node.right.pointer = False
-        node.left.pointer = True
-        addr = self.visit(node.right)
-        print("====")
-        print(node.right)
-        print(addr)
-        value = self.visit(node.left).value
-        print(value)
-        self.memory[addr] = value
+        left, right = self.frame.operands
+        value = self.memory.value(left, self.frame.size)
+        self.memory.store(right, value, self.frame.size)
 
     def visit_StackOp(self, node):
-        value = self.visit(node.expr)
-        if node.op.type == PUSH:
-            self.memory.push(value, length=1)
-        if node.op.type == PUSHQ:
-            self.memory.push(value, length=2)
-        if node.op.type == POP:
-            self.memory.pop(length=1)
-        if node.op.type == POPQ:
-            self.memory.pop(length=2)
+        (operand,) = self.frame.operands
+        if node.op.type in [PUSH, PUSHQ]:
+            self.memory.push(self.memory.value(operand, self.frame.size), self.frame.size)
+        if node.op.type in [POP, POPQ]:
+            self.memory.store(operand, self.memory.pop(self.frame.size), self.frame.size)
 
     def visit_JmpStmt(self, node):
-        addr = int(node.jmpaddr.value, 16)
-        frame = self.memory.frames[addr]
-        if node.op.type == JG and self.cmp_reg == 2:
-            self.jmpd = True
-            self.frame = frame
+        index = self.frame.jump_index
+        if index is None:
+            raise RuntimeError("Jump to unknown address %s" % node.jmpaddr.value)
+        if node.op.type == JG and self.memory.cmp_reg == 2:
+            self.next_index = index
             return
-        if node.op.type == JGE and self.cmp_reg >= 1:
-            self.jmpd = True
-            self.frame = frame
+        if node.op.type == JGE and self.memory.cmp_reg >= 1:
+            self.next_index = index
             return
-        if node.op.type == JE and self.cmp_reg == 0:
-            self.jmpd = True
-            self.frame = frame
+        if node.op.type == JE and self.memory.cmp_reg == 0:
+            self.next_index = index
             return
-        if node.op.type == JNE and self.cmp_reg != 0:
-            self.jmpd = True
-            self.frame = frame
+        if node.op.type == JNE and self.memory.cmp_reg != 0:
+            self.next_index = index
             return
-        if node.op.type == JLE and self.cmp_reg <= -1:
-            self.jmpd = True
-            self.frame = frame
+        if node.op.type == JLE and self.memory.cmp_reg <= -1:
+            self.next_index = index
             return
-        if node.op.type == JL and self.cmp_reg == -2:
-            self.jmpd = True
-            self.frame = frame
+        if node.op.type == JL and self.memory.cmp_reg == -2:
+            self.next_index = index
             return
         if node.op.type == JMPQ:
-            self.jmpd = True
-            self.frame = frame
+            self.next_index = index
             return
         if node.op.type == JMP:
-            self.jmpd = True
-            self.frame = frame
+            self.next_index = index
             return
 
 
     def visit_CmpOp(self, node):
-        node.right.pointer = False
-        node.left.pointer = True
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        self.cmp_reg = Number.__cmp__(right, left)
+        left, right = self.frame.operands
+        size = self.frame.size
+        self.memory.cmp_reg = compare(signed(self.memory.value(right, size), size),
+                                      signed(self.memory.value(left, size), size))
 
     def visit_CallQOp(self, node):
-        addr = self.call_addr
-        for (start, end) in self.memory.ranges.keys():
-            if start <= addr and addr <= end:
-                fct_frame = self.memory.ranges[(start,end)]
-                break
-        self.visit(fct_frame)
+        index = self.frame.jump_index
+        if index is None:
+            index = self.function_index(self.memory.value(self.frame.operands[0]))
+        self.memory.push(self.return_address(self.frame))
+        self.memory.call_stack.append(self.frame.next_index)
+        self.next_index = index
 
     def visit_RetStmt(self, node):
-        ret_addr = self.memory.registers['rbp']
-        if ret_addr == 0:
+        if not self.memory.call_stack:
             raise EndOfExecution
-        for (start, end) in self.memory.ranges.keys():
-            if start <= addr and addr <= end:
-                fct_frame = self.memory.ranges[(start,end)]
-                break
-        return self.visit(fct_frame, start=ret_addr)
+        self.memory.pop()
+        self.next_index = self.memory.call_stack.pop()
+
+    def function_index(self, address):
+        """ Index of the frame at `address`, which must lie in a function. """
+        if address not in self.memory.indexes and self.loader is not None:
+            self.link(address)
+        function = self.memory.function_at(address)
+        if function is None or address not in self.memory.indexes:
+            raise RuntimeError("Call to unknown address 0x%x" % address)
+        return self.memory.indexes[address]
+
+    def return_address(self, frame):
+        """ Address of the frame following `frame`. """
+        if frame.next_index < len(self.memory.program):
+            return self.memory.program[frame.next_index].prog_counter
+        return frame.prog_counter + 1
 
     def visit_NullOp(self, node):
         return
 
-    def visit_AddrExpression(self, node):
-        return Number('l', node.value)
+    def interpret(self, tree, entry='main'):
+        code, index = self.prepare(tree, entry)
+        try:
+            self.execute(code, index)
+        except EndOfExecution:
+            return self.memory.registers['rax']
 
-    def visit_TernaryAddrExpression(self, node):
-        if node.reg_1:
-            return self.visit(node.reg_1) + self.visit(node.offset) * self.visit(node.reg_2)
-        else:
-            return self.visit(node.offset) * self.visit(node.reg_2)
-
-    def visit_CompoundAddrExpression(self, node):
-        if node.token.type == NUMBER:
-            if node.pointer:
-                #print(node.offset)
-                addr = self.visit(node.offset) + self.visit(node.register)
-                res = self.memory.stack[self.visit(node.offset) + self.visit(node.register)]
-                return Number(node.register.value[0], res)
-            else:
-                return self.visit(node.offset) + self.visit(node.register)
-        if node.token.type == ASTERISK:
-            return self.memory.stack[self.visit(node.register)]
+    def start(self, tree, entry='main'):
+        """ Loads a program, to execute it by `run` and `step` calls. """
+        self.code, self.index = self.prepare(tree, entry)
+        self.stop = None
 
+    def run(self, max_instructions=None, timeout=None):
+        """ Executes the program started until its end, or until it has
+        executed `max_instructions` frames or run for `timeout` seconds. The
+        budget is checked after every entry of the code, so that the JIT may
+        exceed it by the rest of a block, and the clock every CLOCK_ENTRIES
+        entries. Returns the `Stop`; the execution resumes at the next call.
+        """
+        return self.resume(self.code, self.weights, max_instructions, timeout)
 
+    def step(self, count=1, break_points=(), until=None):
+        """ Executes exactly `count` frames of the program started, or fewer
+        if it ends, executes a frame at one of the `break_points` addresses or
+        reaches the frame at `until`. As with the traps of the breakpoints
+        given to the interpreter, a breakpoint stops the execution once its
+        frame has run, whereas `until` stops it before its frame. Returns the
+        `Stop`.
+        """
+        code = self.frame_code()
+        weights = self.weights if code is self.code else self.stepping_weights
+        return self.resume(code, weights, count, None, break_points, until)
 
-    def interpret(self, tree):
-        self.preload_functions(tree)
-        node = self.memory['main']
-        self.frame = self.memory.frames[node._start]
+    def resume(self, code, weights, max_instructions, timeout, break_points=(), until=None):
+        """ The execution loop of `run` and `step`, from `self.index`. The
+        entries run through the profiler and the recorder if any, and pause
+        requests are honoured as `execute` does.
+        """
+        if self.index is None:
+            raise RuntimeError("No program started")
+        indexes = self.memory.indexes
+        if until is not None and until not in indexes:
+            raise ValueError("No instruction at address 0x%x" % until)
+        if self.stop is not None and self.stop.reason == END:
+            return Stop(END, 0, None, self.stop.result)
+        limit = float('inf') if max_instructions is None else max_instructions
+        deadline = None if timeout is None else time.monotonic() + timeout
+        hooked = self.profiler is not None or self.recorder is not None
+        run = self.runner(code, weights) if hooked else None
+        wait = self.can_run.wait if self.can_run is not None else None
+        breaks = {indexes[pc] for pc in break_points if pc in indexes}
+        before = None if until is None else indexes[until]
+        stopping = bool(breaks) or before is not None
+        clock = CLOCK_ENTRIES
+        index = self.index
+        executed = 0
+        reason = BUDGET
         try:
-            while True:
+            while executed < limit:
+                next_index = code[index]() if run is None else run(index)
+                executed += weights[index]
+                if wait is not None and next_index != index + 1:
+                    wait()
+                if stopping and (index in breaks or next_index == before):
+                    reason = BREAKPOINT if index in breaks else UNTIL
+                    index = next_index
+                    break
+                index = next_index
+                clock -= 1
+                if not clock:
+                    clock = CLOCK_ENTRIES
+                    if deadline is not None and time.monotonic() >= deadline:
+                        reason = TIMEOUT
+                        break
+        except EndOfExecution:
+            executed += weights[index]
+            reason = END
+        finally:
+            self.index = index
+            self.executed += executed
+            if self.recorder is not None:
+                self.recorder.flush()
+        program = self.memory.program
+        if reason == END:
+            self.stop = Stop(END, executed, None, self.memory.registers['rax'])
+        else:
+            self.stop = Stop(reason, executed, program[index].prog_counter
+                             if index < len(program) else None)
+        return self.stop
+
+    def prepare(self, tree, entry='main'):
+        """ Loads and compiles a program. Returns its code and the index of
+        the function `entry` in it.
+        """
+        self.preload_functions(tree)
+        node = self.memory[entry]
+        index = self.memory.indexes[node._start]
+        return self.compile(self.memory.program), index
+
+    def compile(self, program, code=None):
+        """ Builds the code of the program image: one entry per frame, called
+        to execute it and returning the index of the next entry to call.
+        Frames carrying a breakpoint are wrapped into traps, and the last
+        entry ends the execution. The code is built in `code` if given, so
+        that a table being executed can be rebuilt in place.
+
+        `self.weights` gives the number of frames each entry executes: one,
+        except for the blocks of the JIT which set their own length. With
+        `single_step`, e.g. when recording the execution, the JIT is not used
+        as its blocks would hide the steps they are made of.
+        """
+        if code is None:
+            code = []
+        if self.profiler is not None:
+            self.profiler.load(program)
+        self.weights[:] = [1] * len(program) + [0]
+        if self.mode == CLOSURE or (self.mode == JIT_MODE and self.single_step):
+            code[:] = Compiler(self).compile(program)
+        elif self.mode == JIT_MODE:
+            JIT(self).compile(program, code)
+        else:
+            compiler = Compiler(self)
+            code[:] = [compiler.fallback(frame) for frame in program]
+        self.finish(program, code)
+        self.code = code
+        if self.stepping is not None:
+            self.stepping[:] = Compiler(self).compile(program)
+            self.finish(program, self.stepping)
+            self.stepping_weights[:] = [1] * len(program) + [0]
+        return code
+
+    def finish(self, program, code):
+        """ Wraps the frames carrying a breakpoint and appends the end. """
+        for frame in program:
+            if frame.prog_counter in self.break_points:
+                code[frame.index] = self.trap(code[frame.index], frame)
+        code.append(self.end)
+
+    def frame_code(self):
+        """ Code executing one frame per entry: the code itself, except for
+        the JIT whose blocks run several. Closures are then compiled on first
+        use, and rebuilt along with the code.
+        """
+        if self.mode != JIT_MODE or self.single_step:
+            return self.code
+        if self.stepping is None:
+            program = self.memory.program
+            self.stepping = Compiler(self).compile(program)
+            self.finish(program, self.stepping)
+            self.stepping_weights[:] = [1] * len(program) + [0]
+        return self.stepping
+
+    def trap(self, run, frame):
+        """ Wraps the code of a frame carrying a breakpoint: once executed,
+        the state is sent to the debugger and the execution paused.
+        """
+        def run_trap():
+            next_index = run()
+            AsmQueue.put((frame.prog_counter, self.memory.snapshot()))
+            if self.can_run is not None:
+                self.can_run.clear()
                 self.can_run.wait()
-                self.visit(self.frame)
-                if self.frame.prog_counter in self.break_points:
-                    AsmQueue.put((self.frame.prog_counter, deepcopy(self.memory)))
-                    self.can_run.clear()
-                if self.jmpd:
-                    self.jmpd = False
-                else:
-                    index = self.memory.prog_counters.index(self.frame.prog_counter)
-                    try:
-                        self.frame = self.memory.frames[self.memory.prog_counters[index + 1]]
-                    except IndexError:
-                        raise EndOfExecution
-        except EndOfExecution as _:
-            return self.memory.registers['rax']
+            return next_index
+        return run_trap
+
+    def end(self):
+        raise EndOfExecution
+
+    def execute(self, code, index):
+        """ Runs the code from `index`. Without debugger, nothing else than
+        the code is executed; otherwise pause requests are honoured when the
+        control flow leaves a straight-line block. When counting, profiling
+        or recording, the code runs through `resume`, and the end it reaches
+        is raised again as the plain loops do.
+        """
+        if self.counting or self.profiler is not None or self.recorder is not None:
+            self.index = index
+            self.stop = None
+            self.resume(code, self.weights, None, None)
+            raise EndOfExecution
+        if self.can_run is None:
+            while True:
+                index = code[index]()
+        wait = self.can_run.wait
+        while True:
+            next_index = code[index]()
+            if next_index != index + 1:
+                wait()
+            index = next_index
+
+    def runner(self, code, weights):
+        """ The function executing the entry `index` of `code`, whose
+        `weights` are given, and returning the next one, through the profiler
+        and the recorder if any, so that both observe the same execution.
+        """
+        def run(index):
+            return code[index]()
+        if self.profiler is not None:
+            run = self.profiler.wrap(run, weights)
+        if self.recorder is not None:
+            run = self.recorder.wrap(run)
+        return run
 
     @staticmethod
-    def run(program):
+    def run_program(program):
         try:
             lexer = Lexer(program)
             parser = Parser(lexer)
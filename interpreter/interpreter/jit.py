@@ -0,0 +1,319 @@
+# -*- coding:utf8 -*-
+"""
+Compiles the basic blocks of the program image into Python functions.
+
+A basic block is a straight-line run of frames ending at a jump, a call, a
+return or right before a jump target, and cut every MAX_BLOCK frames so that
+long straight-line code does not make huge functions. Each block is emitted
+as the source of one Python function holding the register slots it touches
+in locals, writing them back when the block exits, and returning the index
+of the next frame. Blocks are compiled on their first execution and cached
+by start address.
+Instructions that cannot be inlined run through the closure compiler.
+"""
+from .compiler import Compiler
+from .memory import Registers, SLOTS
+from .operand import Operand, REGISTER, IMMEDIATE, INDIRECT
+from .number import compare, signed
+from ..lexical_analysis.token_type import ADD_OP, ADDL_OP, SUB_OP, AND_OP, XOR_OP
+from ..lexical_analysis.token_type import SHL_OP, SHR_OP, MUL_OP, LEA_OP, TEST
+from ..lexical_analysis.token_type import NOT_OP, NEG_OP, DEC_OP
+from ..lexical_analysis.token_type import JL, JG, JGE, JLE, JE, JNE, JMP, JMPQ
+from ..lexical_analysis.token_type import PUSH, PUSHQ
+from ..syntax_analysis.tree import NodeVisitor, JmpStmt, CallQOp, RetStmt
+
+M64 = 2**64
+
+MAX_BLOCK = 64
+
+RSP = Operand(REGISTER, register='rsp')
+
+OPERATORS = {
+    ADD_OP: '+',
+    ADDL_OP: '+',
+    SUB_OP: '-',
+    AND_OP: '&',
+    XOR_OP: '^',
+    SHL_OP: '<<',
+    SHR_OP: '>>',
+    MUL_OP: '*',
+}
+
+CONDITIONS = {
+    JG: 'flag == 2',
+    JGE: 'flag >= 1',
+    JE: 'flag == 0',
+    JNE: 'flag != 0',
+    JLE: 'flag <= -1',
+    JL: 'flag == -2',
+}
+
+
+class JIT(NodeVisitor):
+    """ Turns the basic blocks of the program image into Python functions. """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.memory = interpreter.memory
+        self.compiler = Compiler(interpreter)
+        self.blocks = {}
+        self.code = []
+        self.leaders = set()
+        self.frame = None
+        self.slots = set()
+        self.dirty = set()
+        self.flag = False
+
+    def compile(self, program, code=None):
+        """ Returns the list of block entry points, indexed like the program
+        image, built in `code` if given. Each entry compiles its block the
+        first time it is called.
+        """
+        self.leaders = self.find_leaders(program)
+        self.code = code if code is not None else []
+        self.code[:] = [self.stub(index) for index in range(len(program))]
+        return self.code
+
+    def find_leaders(self, program):
+        """ Indexes starting a basic block. """
+        leaders = set()
+        for function in self.memory.functions.values():
+            leaders.add(self.memory.indexes[function._start])
+        for frame in program:
+            instr = frame.instr
+            if frame.jump_index is not None:
+                leaders.add(frame.jump_index)
+            if isinstance(instr, (JmpStmt, CallQOp, RetStmt)) or \
+               frame.prog_counter in self.interpreter.break_points:
+                leaders.add(frame.index)
+                leaders.add(frame.next_index)
+        return leaders
+
+    def stub(self, index):
+        """ Entry point compiling the block starting at `index`, and replacing
+        itself with it unless it has been wrapped in the meantime.
+        """
+        def enter():
+            block = self.block(index)
+            if self.code[index] is enter:
+                self.code[index] = block
+            return block()
+        return enter
+
+    def block(self, index):
+        """ Compiles (or fetches from the cache) the block starting at `index`. """
+        program = self.memory.program
+        start = program[index]
+        if start.prog_counter in self.blocks:
+            return self.blocks[start.prog_counter]
+
+        self.slots = set()
+        self.dirty = set()
+        self.flag = False
+        body = []
+        length = 0
+        frame = start
+        while True:
+            lines = self.visit(frame)
+            if lines is None:
+                if body:
+                    body.append("return %r" % frame.index)
+                break
+            body.extend(lines)
+            length += 1
+            if isinstance(frame.instr, JmpStmt):
+                break
+            next_index = frame.next_index
+            if next_index >= len(program) or next_index in self.leaders or \
+               length == MAX_BLOCK:
+                body.append("return %r" % next_index)
+                break
+            frame = program[next_index]
+        if body:
+            function = self.build(start, body)
+            self.interpreter.weights[index] = length
+        else:
+            function = self.compiler.visit(start)
+        self.blocks[start.prog_counter] = function
+        return function
+
+    def build(self, start, body):
+        """ Wraps the body of a block with the load and write back of its
+        registers, and compiles it.
+        """
+        head = ["%s = R[%d]" % (self.local(slot), slot) for slot in sorted(self.slots)]
+        tail = ["R[%d] = %s" % (slot, self.local(slot)) for slot in sorted(self.dirty)]
+        if self.flag:
+            head.append("flag = M.cmp_reg")
+            tail.append("M.cmp_reg = flag")
+        lines = []
+        for line in head + body:
+            statement = line.lstrip()
+            if statement.startswith("return "):
+                indent = line[:len(line) - len(statement)]
+                lines.append(indent + "_next = " + statement[len("return "):])
+                lines.extend(indent + line for line in tail)
+                lines.append(indent + "return _next")
+            else:
+                lines.append(line)
+        source = "def block():\n" + "".join("    %s\n" % line for line in lines)
+        namespace = {
+            'R': self.memory.registers._slots,
+            'load': self.memory.stack.load,
+            'store': self.memory.stack.store,
+            'M': self.memory,
+            'compare': compare,
+            'signed': signed,
+        }
+        exec(compile(source, "<block 0x%08x>" % start.prog_counter, "exec"), namespace)
+        return namespace['block']
+
+    ###########################################################################
+    #  Operands                                                               #
+    ###########################################################################
+
+    @staticmethod
+    def local(slot):
+        return "r_" + SLOTS[slot]
+
+    def read(self, name):
+        """ Expression of the value of a register. """
+        slot, mask, shift, _ = Registers.view(name)
+        self.slots.add(slot)
+        if shift:
+            return "((%s >> %d) & %d)" % (self.local(slot), shift, mask)
+        if mask != M64 - 1:
+            return "(%s & %d)" % (self.local(slot), mask)
+        return self.local(slot)
+
+    def value(self, operand):
+        """ Expression of the value of a source operand. """
+        if operand.kind == REGISTER:
+            return self.read(operand.register)
+        if operand.kind == IMMEDIATE:
+            return "%d" % operand.immediate
+        if operand.kind == INDIRECT:
+            return self.value(operand.inner)
+        return "load(%s, %d)" % (self.address(operand), self.frame.size)
+
+    def address(self, operand):
+        """ Expression of the address a memory operand designates. """
+        terms = ["%d" % operand.displacement] if operand.displacement else []
+        if operand.base:
+            terms.append(self.read(operand.base))
+        if operand.index:
+            terms.append("%d * %s" % (operand.scale, self.read(operand.index)))
+        return "(%s)" % " + ".join(terms or ["0"])
+
+    def write(self, operand, value):
+        """ Lines storing `value` into a destination operand. """
+        if operand.kind != REGISTER:
+            return ["store(%s, %s, %d)" % (self.address(operand), value, self.frame.size)]
+        slot, mask, shift, keep = Registers.view(operand.register)
+        self.slots.add(slot)
+        self.dirty.add(slot)
+        name = self.local(slot)
+        if not keep:
+            return ["%s = (%s) & %d" % (name, value, mask)]
+        return ["%s = (%s & %d) | (((%s) & %d) << %d)" % (name, name, keep, value, mask, shift)]
+
+    def operate(self, operand, operator, other):
+        """ Lines applying `destination operator= other`. """
+        if operand.kind != REGISTER:
+            return ["_address = %s" % self.address(operand),
+                    "store(_address, load(_address, %d) %s %s, %d)"
+                    % (self.frame.size, operator, other, self.frame.size)]
+        return self.write(operand, "%s %s %s" % (self.read(operand.register), operator, other))
+
+    def set_flag(self, expression):
+        self.flag = True
+        return "flag = %s" % expression
+
+    ###########################################################################
+    #  Operations                                                             #
+    ###########################################################################
+
+    def generic_visit(self, node):
+        return None
+
+    def visit_Frame(self, node):
+        self.frame = node
+        return self.visit(node.instr)
+
+    def visit_NullOp(self, node):
+        return []
+
+    def visit_MovOp(self, node):
+        left, right = self.frame.operands
+        return self.write(right, self.value(left))
+
+    def visit_BinOp(self, node):
+        left, right = self.frame.operands
+        ttype = node.op.type
+        if ttype == LEA_OP:
+            return self.write(right, self.address(left))
+        if ttype == TEST:
+            return [self.set_flag("int(%s & %s)" % (self.value(right), self.value(left)))]
+        if ttype not in OPERATORS:
+            return None
+        lines = ["_other = %s" % self.value(left)]
+        lines += self.operate(right, OPERATORS[ttype], "_other")
+        if ttype != MUL_OP:
+            lines.append(self.set_flag("0 if _other == 0 else 1"))
+        return lines
+
+    def visit_TernOp(self, node):
+        if node.op.type != MUL_OP:
+            return None
+        left, middle, right = self.frame.operands
+        return self.write(right, "%s * %s" % (self.value(left), self.value(middle)))
+
+    def visit_UnOp(self, node):
+        (operand,) = self.frame.operands
+        ttype = node.op.type
+        lines = []
+        if operand.kind == REGISTER:
+            value = self.read(operand.register)
+        else:
+            lines.append("_value = %s" % self.value(operand))
+            value = "_value"
+        if ttype in [NOT_OP, NEG_OP]:
+            operator = '~' if ttype == NOT_OP else '-'
+            return lines + self.write(operand, operator + value)
+        operator = '-' if ttype == DEC_OP else '+'
+        return lines + [self.set_flag("0 if %s == 0 else 1" % value)] + \
+            self.write(operand, "%s %s 1" % (value, operator))
+
+    def visit_StackOp(self, node):
+        (operand,) = self.frame.operands
+        size = self.frame.size
+        rsp = self.read('rsp')
+        lines = []
+        if node.op.type in [PUSH, PUSHQ]:
+            lines.append("_value = %s" % self.value(operand))
+            lines += self.write(RSP, "%s - %d" % (rsp, size))
+            lines.append("store(%s, _value, %d)" % (rsp, size))
+            return lines
+        lines.append("_value = load(%s, %d)" % (rsp, size))
+        lines += self.write(RSP, "%s + %d" % (rsp, size))
+        return lines + self.write(operand, "_value")
+
+    def visit_CmpOp(self, node):
+        left, right = self.frame.operands
+        size = self.frame.size
+        return [self.set_flag("compare(signed(%s, %d), signed(%s, %d))"
+                              % (self.value(right), size, self.value(left), size))]
+
+    def visit_JmpStmt(self, node):
+        index = self.frame.jump_index
+        if index is None:
+            return None
+        ttype = node.op.type
+        if ttype in [JMP, JMPQ]:
+            return ["return %r" % index]
+        if ttype not in CONDITIONS:
+            return ["return %r" % self.frame.next_index]
+        self.flag = True
+        return ["if %s:" % CONDITIONS[ttype],
+                "    return %r" % index,
+                "return %r" % self.frame.next_index]
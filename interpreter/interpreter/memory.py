@@ -1,106 +1,229 @@
 # -*- coding:utf8 -*-
 import random
+from bisect import bisect_right
+from array import array
 from collections import OrderedDict
-from ctypes import c_int
-from ..syntax_analysis.tree import Node, Register, AddrExpression
-import sys
-
-class Stack(object):
-    def __init__(self, address):
-        self._stack = dict({address: 0})
-        self._max = address
+from copy import copy
+from struct import Struct
+from ..lexical_analysis.token_type import MOVL, ADDL_OP, CMPL_OP, PUSH, PUSHQ, POP, POPQ
+from ..syntax_analysis.tree import Node, Register, AddrExpression, JmpStmt, CallQOp
+from .operand import REGISTER, IMMEDIATE, INDIRECT, resolve_operands
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+ADDRESS_MASK = 2**64 - 1
+
+FORMATS = {
+    1: Struct('<B'),
+    2: Struct('<H'),
+    4: Struct('<I'),
+    8: Struct('<Q'),
+}
+
+MASKS = {size: 2**(8 * size) - 1 for size in FORMATS}
+
+class PagedMemory(object):
+    """ Byte addressable little-endian guest memory, made of 4 KiB pages
+    allocated the first time they are written. Pages are shared with
+    snapshots and copied on their first write afterwards.
+    """
+    def __init__(self):
+        self.pages = {}
+        self.owned = set()
 
     def __bool__(self):
-        return bool(self._stack)
+        return bool(self.pages)
+
+    def load(self, address, size):
+        """ Loads an unsigned integer of `size` bytes. """
+        address &= ADDRESS_MASK
+        offset = address & PAGE_MASK
+        if offset + size > PAGE_SIZE:
+            return int.from_bytes(self.read(address, size), 'little')
+        page = self.pages.get(address >> PAGE_SHIFT)
+        if page is None:
+            return 0
+        return FORMATS[size].unpack_from(page, offset)[0]
+
+    def store(self, address, value, size):
+        """ Stores the `size` lower bytes of `value`. """
+        address &= ADDRESS_MASK
+        value &= MASKS[size]
+        offset = address & PAGE_MASK
+        if offset + size > PAGE_SIZE:
+            self.write(address, value.to_bytes(size, 'little'))
+            return
+        FORMATS[size].pack_into(self.page(address >> PAGE_SHIFT), offset, value)
+
+    def page(self, number):
+        """ The page `number`, owned by this memory and thus writable. """
+        if number in self.owned:
+            return self.pages[number]
+        page = self.pages.get(number)
+        page = self.pages[number] = bytearray(page) if page else bytearray(PAGE_SIZE)
+        self.owned.add(number)
+        return page
+
+    def snapshot(self):
+        """ A copy-on-write copy of the memory: the pages are shared until
+        either side writes them.
+        """
+        snapshot = PagedMemory()
+        snapshot.pages = dict(self.pages)
+        self.owned = set()
+        return snapshot
+
+    def restore(self, snapshot):
+        """ Comes back to the content of a snapshot, still sharing its pages
+        until they are written.
+        """
+        self.pages = dict(snapshot.pages)
+        self.owned = set()
+
+    def read(self, address, length):
+        """ Reads `length` bytes, possibly across several pages. """
+        result = bytearray()
+        while length > 0:
+            offset = address & PAGE_MASK
+            chunk = min(length, PAGE_SIZE - offset)
+            page = self.pages.get(address >> PAGE_SHIFT)
+            if page is None:
+                result += bytes(chunk)
+            else:
+                result += memoryview(page)[offset:offset + chunk]
+            address = (address + chunk) & ADDRESS_MASK
+            length -= chunk
+        return bytes(result)
+
+    def write(self, address, data):
+        """ Writes `data`, possibly across several pages. """
+        data = memoryview(data)
+        while data:
+            offset = address & PAGE_MASK
+            chunk = min(len(data), PAGE_SIZE - offset)
+            self.page(address >> PAGE_SHIFT)[offset:offset + chunk] = data[:chunk]
+            address = (address + chunk) & ADDRESS_MASK
+            data = data[chunk:]
 
-    def __getitem__(self, key):
-        if isinstance(key, int):
-            if not self._stack.get(key, False):
-                self.__setitem__(key, 0)
-            return self._stack[key]
-        elif not self._stack.get(key.value, False):
-            self.__setitem__(key.value, 0)
-        return self._stack[key.value]
-
-    def __setitem__(self, key, value):
-        self._stack[key] = value
-        self._stack = dict({key : self._stack[key] for key in sorted(self._stack.keys())})
-        self._max = max(self._max, key + 4)
-
-    def push(self, variable, length):
-        if length == 1:
-            key = self._max
-            self._stack[key] = c_int(variable.value)
-        elif length == 2:
-            key = self._max
-            key_2 = self._max + 4
-            first = c_int(variable)
-            second = c_int(variable >> 32)
-            self._stack[key] = first
-            self._stack[key_2] = second
-            self._max = key_2
-        else:
-            raise RuntimeError("Unknown int size")
-
-    def pop(self, length):
-        result = -1
-        if length == 1 and self._stack:
-            result = self._stack[self._max]
-            del self._stack[self._max]
-            self._max -= 4
-        elif length == 2 and len(self._stack) >= 2:
-            first = self._stack[self._max] << 32
-            del self._stack[self._max]
-            second = self._stack[self._max - 4]
-            del self._stack[self._max - 4]
-            self._max -= 8
-            return first + second
+    def __repr__(self):
+        lines = []
+        for number in sorted(self.pages.keys()):
+            page = self.pages[number]
+            for offset in range(0, PAGE_SIZE, 16):
+                row = page[offset:offset + 16]
+                if any(row):
+                    lines.append("0x%016x: %s" % ((number << PAGE_SHIFT) + offset,
+                                                  " ".join("%02x" % byte for byte in row)))
+        return "\n".join(lines)
+
+
+SLOTS = ['rax', 'rbx', 'rcx', 'rdx', 'rsi', 'rdi', 'rbp', 'rsp',
+         'r8', 'r9', 'r10', 'r11', 'r12', 'r13', 'r14', 'r15']
+
+def _views():
+    """ Maps every register name to (slot, mask, shift, keep): the canonical
+    slot it lives in, the mask and shift of its bits, and the mask of the
+    slot bits preserved when it is written. Writes to 32 bits registers
+    zero-extend, as on x86_64.
+    """
+    views = {}
+    def add(name, slot, size, shift=0):
+        mask = 2**(8 * size) - 1
+        keep = 0 if size >= 4 else (2**64 - 1) ^ (mask << shift)
+        views[name] = (slot, mask, shift, keep)
+    for slot, name in enumerate(SLOTS):
+        add(name, slot, 8)
+        if name[1].isdigit():
+            add(name + 'd', slot, 4)
+            add(name + 'w', slot, 2)
+            add(name + 'b', slot, 1)
+        elif name[2] == 'x':
+            add('e' + name[1:], slot, 4)
+            add(name[1:], slot, 2)
+            add(name[1] + 'l', slot, 1)
+            add(name[1] + 'h', slot, 1, shift=8)
         else:
-            raise RuntimeError("SEGFAULT")
+            add('e' + name[1:], slot, 4)
+            add(name[1:], slot, 2)
+            add(name[1:] + 'l', slot, 1)
+    return views
 
-    def __repr__(self):
-        keys = [str(key) for key in self._stack.keys()]
-        max_len = max(len(key) for key in keys)
-        l_1 = "|".join(keys) + "\n"
-        res = ""
-        for i  in self._stack.keys():
-            value = str(self._stack[i])
-            remaining_len = max_len - len(value)
-            res += value + " " * remaining_len + "|"
-        return l_1 + res
+VIEWS = _views()
 
+RSP = SLOTS.index('rsp')
 
 class Registers():
+    """ The register file: 16 canonical 64 bits slots, every register name
+    being a view on one of them.
+    """
     def __init__(self, rsp, rbp):
-        self._store = dict()
-        for reg in ['ax', 'bx', 'cx', 'dx', 'rax', 'rbx', 'rcx', 'rdx', 'rbp',
-                    'rsp', 'rsi', 'rdi', 'r8', 'r9', 'r10', 'r11', 'r12',
-                    'r13', 'r14', 'r15', 'r8d', 'r9d', 'r10d', 'r11d', 'r12d',
-                    'r13d', 'r14d', 'r15d','eax', 'ebx', 'ecx', 'edx', 'esp',
-                    'esi', 'edi']:
-            self._store[reg] = 0
+        self._slots = array('Q', [0] * len(SLOTS))
         self.__setitem__('rsp', rsp)
         self.__setitem__('rbp', rbp)
 
+    @staticmethod
+    def view(key):
+        try:
+            return VIEWS[key]
+        except KeyError:
+            raise KeyError("Register %s does not exists" % key) from None
 
     def __setitem__(self, key, value):
-        self._store[key] = value
+        slot, mask, shift, keep = self.view(key)
+        slots = self._slots
+        slots[slot] = (slots[slot] & keep) | ((value & mask) << shift)
 
     def __getitem__(self, key):
-        if key in self._store.keys():
-            return self._store[key]
-        else:
-            raise KeyError("Register %s does not exists" % key)
+        slot, mask, shift, _ = self.view(key)
+        return (self._slots[slot] >> shift) & mask
+
+    def copy(self):
+        registers = copy(self)
+        registers._slots = array('Q', self._slots)
+        return registers
 
     def __repr__(self):
-        res = ""
-        res = ["{} : {}\n".format(reg, self._store[reg]) for reg in sorted(self._store.keys())]
+        res = ["{} : {}\n".format(reg, self._slots[slot]) for slot, reg in enumerate(SLOTS)]
         return "".join(res)
 
+SUFFIX_SIZES = {
+    MOVL: 4,
+    ADDL_OP: 4,
+    CMPL_OP: 4,
+    PUSH: 8,
+    PUSHQ: 8,
+    POP: 8,
+    POPQ: 8,
+}
+
+def register_size(name):
+    """ Width in bytes of a register. """
+    _, mask, _, _ = Registers.view(name)
+    return mask.bit_length() // 8
+
+def operand_size(instr):
+    """ Width in bytes of the memory accesses of an instruction, given by
+    the suffix of its mnemonic or else by its register operands.
+    """
+    op = getattr(instr, 'op', None)
+    if op is not None and op.type in SUFFIX_SIZES:
+        return SUFFIX_SIZES[op.type]
+    for name in ['left', 'right', 'middle', 'operand', 'expr']:
+        operand = getattr(instr, name, None)
+        if isinstance(operand, Register):
+            return register_size(operand.value)
+    return 8
+
 class Frame(Node):
     def __init__(self, instr):
         self.prog_counter = instr.prog_counter
         self.instr = instr
+        self.size = operand_size(instr)
+        self.operands = resolve_operands(instr)
+        self.index = -1
+        self.next_index = -1
+        self.jump_index = None
 
 class FunctionFrame(Node):
     def __init__(self, section):
@@ -116,204 +239,145 @@ class Memory():
     def __init__(self):
         rbp = 0
         rsp = random.randrange(2**16, 2**32-1, 4)
-        self.stack = Stack(rsp)
+        self.stack = PagedMemory()
         self.registers = Registers(rsp, rbp)
         self.cmp_reg = 0
+        self.call_stack = []
         self.ranges = {}
         self.functions = OrderedDict()
         self.frames = {}
         self.prog_counters = []
+        self.program = []
+        self.indexes = {}
+        self.starts = []
+        self.bounds = []
+
+    def _create_boundaries(self):
+        """ Sorts the function boundaries, for `function_at` lookups. """
+        self.bounds = sorted((function._start, function._end, function)
+                             for function in self.functions.values())
+        self.starts = [start for start, _, _ in self.bounds]
+
+    def function_at(self, address):
+        """ The function frame containing `address`, or None. """
+        position = bisect_right(self.starts, address) - 1
+        if position >= 0:
+            _, end, function = self.bounds[position]
+            if address <= end:
+                return function
+        return None
 
     def _create_frames(self):
+        """ Builds the program image: a flat array of frames sorted by
+        program counter, each one knowing the index of its successor and of
+        its jump or call target. The successor of the last frame is the index
+        past the end of the image.
+        """
         for function in self.functions:
             for frame in self.functions[function]._frames:
                 self.frames[frame.prog_counter] = frame
         self.prog_counters = sorted(self.frames.keys())
-
+        self.program = [self.frames[pc] for pc in self.prog_counters]
+        self.indexes = {pc: index for index, pc in enumerate(self.prog_counters)}
+        for index, frame in enumerate(self.program):
+            frame.index = index
+            frame.next_index = index + 1
+            if isinstance(frame.instr, JmpStmt):
+                target = frame.instr.jmpaddr
+            elif isinstance(frame.instr, CallQOp):
+                target = frame.instr.call_addr
+            else:
+                continue
+            if isinstance(target, AddrExpression):
+                frame.jump_index = self.indexes.get(int(target.value, 16))
+
+
+    def snapshot(self):
+        """ A copy of the machine state: registers, flags, call stack and
+        copy-on-write memory. The program image is shared, not copied.
+        """
+        snapshot = copy(self)
+        snapshot.registers = self.registers.copy()
+        snapshot.call_stack = list(self.call_stack)
+        snapshot.stack = self.stack.snapshot()
+        return snapshot
+
+    def restore(self, snapshot):
+        """ Comes back to the machine state of a snapshot of this memory. The
+        state is copied into the current registers, call stack and memory,
+        which the compiled code holds on to.
+        """
+        self.registers._slots[:] = snapshot.registers._slots
+        self.cmp_reg = snapshot.cmp_reg
+        self.call_stack[:] = snapshot.call_stack
+        self.stack.restore(snapshot.stack)
 
     def _check(self, break_points):
         return all([break_point in self.frames.keys() for break_point in break_points])
 
-    def __setitem__(self, item, value):
-        if item.register:
-            self.registers[item.register] = value % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] = value
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] = value
-                self.registers[item.register[:-1]] %= 2**32
+    def address(self, operand):
+        """ Address of a memory operand. """
+        address = operand.displacement
+        if operand.base:
+            address += self.registers[operand.base]
+        if operand.index:
+            address += operand.scale * self.registers[operand.index]
+        return address
+
+    def value(self, operand, size=8):
+        kind = operand.kind
+        if kind == REGISTER:
+            return self.registers[operand.register]
+        if kind == IMMEDIATE:
+            return operand.immediate
+        if kind == INDIRECT:
+            return self.value(operand.inner)
+        return self.stack.load(self.address(operand), size)
+
+    def store(self, operand, value, size=8):
+        if operand.kind == REGISTER:
+            self.registers[operand.register] = value
         else:
-            self.stack[item.value] = value
+            self.stack.store(self.address(operand), value, size)
 
     def __getitem__(self, item):
         return self.functions[item]
 
-    def iadd(self, item, other):
-        if item.register:
-            self.registers[item.register] += other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] += other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] += other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] += other
-
-    def imul(self, item, other):
-        if item.register:
-            self.registers[item.register] *= other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] *= other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] *= other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] *= other
-
-    def mul(self, item, other, other_bis):
-        if item.register:
-            self.registers[item.register] = (other * other_bis) % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] = other * other_bis
-                self.registers['r' + item.register[1:]] %= 2**32
-        else:
-            self.stack[item.value] = other * other_bis
-
-    def isub(self, item, other):
-        if item.register:
-            self.registers[item.register] -= other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] -= other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] -= other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] -= other
-
-    def iand(self, item, other):
-        if item.register:
-            self.registers[item.register] &= other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] &= other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] &= other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] &= other
-
-    def ixor(self, item, other):
-        if item.register:
-            self.registers[item.register] ^= other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] ^= other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] ^= other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] ^= other
-
-    def inot(self, item):
-        if item.register:
-            self.registers[item.register] = ~self.registers[item.register] % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] = ~self.registers['r' + item.register[1:]]
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] = ~self.registers[item.register[:-1]]
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] = ~self.stack[item.value]
-
-    def idec(self, item):
-        if item.register:
-            self.registers[item.register] -= 1 % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] -= 1
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] -= 1
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] -= 1
-
-    def iinc(self, item):
-        if item.register:
-            self.registers[item.register] += 1 % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] += 1
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] += 1
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] += 1
-
-    def ineg(self, item):
-        if item.register:
-            self.registers[item.register] = -self.registers[item.register] % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] = -self.registers['r' + item.register[1:]]
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] = -self.registers[item.register[:-1]]
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] = -self.stack[item.value]
-
-    def ishl(self, item, other):
-        if item.register:
-            self.registers[item.register] <<= other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] <<= other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] <<= other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] <<= other
-
-    def ishr(self, item, other):
-        if item.register:
-            self.registers[item.register] >>= other % 2**64
-            if item.register.startswith('e'):
-                self.registers[item.register] %= 2**32
-                self.registers['r' + item.register[1:]] >>= other
-                self.registers['r' + item.register[1:]] %= 2**32
-            if item.register.endswith('d'):
-                self.registers[item.register] %= 2**32
-                self.registers[item.register[:-1]] >>= other
-                self.registers[item.register[:-1]] %= 2**32
-        else:
-            self.stack[item.value] >>= other
+    def iadd(self, item, other, size=8):
+        self.store(item, self.value(item, size) + other, size)
+
+    def imul(self, item, other, size=8):
+        self.store(item, self.value(item, size) * other, size)
+
+    def mul(self, item, other, other_bis, size=8):
+        self.store(item, other * other_bis, size)
+
+    def isub(self, item, other, size=8):
+        self.store(item, self.value(item, size) - other, size)
+
+    def iand(self, item, other, size=8):
+        self.store(item, self.value(item, size) & other, size)
+
+    def ixor(self, item, other, size=8):
+        self.store(item, self.value(item, size) ^ other, size)
+
+    def inot(self, item, size=8):
+        self.store(item, ~self.value(item, size), size)
+
+    def idec(self, item, size=8):
+        self.store(item, self.value(item, size) - 1, size)
+
+    def iinc(self, item, size=8):
+        self.store(item, self.value(item, size) + 1, size)
+
+    def ineg(self, item, size=8):
+        self.store(item, -self.value(item, size), size)
+
+    def ishl(self, item, other, size=8):
+        self.store(item, self.value(item, size) << other, size)
+
+    def ishr(self, item, other, size=8):
+        self.store(item, self.value(item, size) >> other, size)
 
     def __repr__(self):
         return "{}\nStack\n{}\n{}".format(
@@ -325,9 +389,16 @@ class Memory():
     def __str__(self):
         return self.__repr__()
 
-    def push(self, value, length):
-        self.stack.push(value, length)
+    def load(self, address, size=8):
+        return self.stack.load(address, size)
 
-    def pop(self, length):
-        self.stack.pop(length)
+    def push(self, value, size=8):
+        slots = self.registers._slots
+        rsp = slots[RSP] = (slots[RSP] - size) & ADDRESS_MASK
+        self.stack.store(rsp, value, size)
 
+    def pop(self, size=8):
+        slots = self.registers._slots
+        rsp = slots[RSP]
+        slots[RSP] = (rsp + size) & ADDRESS_MASK
+        return self.stack.load(rsp, size)
@@ -2,6 +2,32 @@
 """
 Defines a number, with all the computations associated to it.
 """
+def compare(value, other):
+    """ Compares two integers, as stored in the comparison register. """
+    if value < other:
+        return -2
+    if value <= other:
+        return -1
+    if value == other:
+        return 0
+    if value > other:
+        return 2
+    if value >= other:
+        return 1
+    raise Exception("Impossible")
+
+
+def signed(value, size):
+    """ The two's complement value of the `size` lower bytes of an integer,
+    as read by the signed comparisons.
+    """
+    bits = 8 * size
+    value &= (1 << bits) - 1
+    if value >> (bits - 1):
+        return value - (1 << bits)
+    return value
+
+
 class Number():
     """ A number.
     """
@@ -65,17 +91,7 @@ class Number():
 
     def __cmp__(self, other):
         """ Compares two integers """
-        if self.value < other.value:
-            return -2
-        if self.value <= other.value:
-            return -1
-        if self.value == other.value:
-            return 0
-        if self.value > other.value:
-            return 2
-        if self.value >= other.value:
-            return 1
-        raise Exception("Impossible")
+        return compare(self.value, other.value)
 
     def __and__(self, other):
         """ self & other """
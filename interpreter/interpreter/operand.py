@@ -0,0 +1,105 @@
+# -*- coding:utf8 -*-
+"""
+Operands of the instructions, resolved once when the program is loaded.
+
+The syntax tree tells apart registers, numbers and address expressions, but
+whether an address expression designates memory or its own value depends on
+the instruction using it. The resolution fixes it for every operand, along
+with its registers, displacement and scale, so that the execution never has
+to look at the tree again.
+"""
+from ..lexical_analysis.token_type import NUMBER, ASTERISK, POP, POPQ
+from ..syntax_analysis.tree import Register, AddrExpression
+from ..syntax_analysis.tree import CompoundAddrExpression, TernaryAddrExpression
+from ..syntax_analysis.tree import BinOp, TernOp, UnOp, MovOp, XchgOp, CmpOp
+from ..syntax_analysis.tree import StackOp, CallQOp, JmpStmt
+
+REGISTER = 'REGISTER'
+IMMEDIATE = 'IMMEDIATE'
+MEMORY = 'MEMORY'
+INDIRECT = 'INDIRECT'
+
+
+class Operand():
+    """ A resolved operand:
+    - REGISTER: the register `register`;
+    - IMMEDIATE: the constant `immediate`;
+    - MEMORY: the memory at `displacement + base + scale * index`, `base`
+      and `index` being register names or None;
+    - INDIRECT: the value of the operand `inner`, as the target of a call.
+    """
+    def __init__(self, kind, register=None, immediate=0, base=None, index=None,
+                 scale=1, displacement=0, inner=None):
+        self.kind = kind
+        self.register = register
+        self.immediate = immediate
+        self.base = base
+        self.index = index
+        self.scale = scale
+        self.displacement = displacement
+        self.inner = inner
+
+    def __repr__(self):
+        if self.kind == REGISTER:
+            return "%" + self.register
+        if self.kind == IMMEDIATE:
+            return "$0x%x" % self.immediate
+        if self.kind == INDIRECT:
+            return "*%r" % self.inner
+        displacement = self.displacement
+        text = "-0x%x" % -displacement if displacement < 0 else "0x%x" % displacement
+        if not self.base and not self.index:
+            return text
+        registers = "%" + self.base if self.base else ""
+        if self.index:
+            registers += ",%%%s,%d" % (self.index, self.scale)
+        return "%s(%s)" % (text if displacement else "", registers)
+
+
+def resolve(node, destination=False):
+    """ Resolves an operand. A number designates its own value, except as a
+    destination where it is an absolute address.
+    """
+    if node is None:
+        return None
+    if isinstance(node, Register):
+        return Operand(REGISTER, register=node.value)
+    if isinstance(node, AddrExpression):
+        value = int(node.value, 16)
+        if destination:
+            return Operand(MEMORY, displacement=value)
+        return Operand(IMMEDIATE, immediate=value)
+    if isinstance(node, CompoundAddrExpression):
+        if node.token.type == ASTERISK:
+            return Operand(INDIRECT, inner=resolve(node.register))
+        return Operand(MEMORY, base=node.register.value,
+                       displacement=int(node.offset.value, 16))
+    if isinstance(node, TernaryAddrExpression):
+        return Operand(MEMORY,
+                       base=node.reg_1.value if node.reg_1 else None,
+                       index=node.reg_2.value,
+                       scale=int(node.offset.value, 16),
+                       displacement=int(node.token.value, 16)
+                       if node.token.type == NUMBER else 0)
+    raise TypeError("Unexpected operand %s" % type(node).__name__)
+
+
+def resolve_operands(instr):
+    """ The resolved operands of an instruction, sources first and
+    destination last, as in the AT&T syntax.
+    """
+    if isinstance(instr, (BinOp, MovOp, CmpOp)):
+        return (resolve(instr.left), resolve(instr.right, True))
+    if isinstance(instr, XchgOp):
+        return (resolve(instr.left, True), resolve(instr.right, True))
+    if isinstance(instr, TernOp):
+        return (resolve(instr.left), resolve(instr.middle), resolve(instr.right, True))
+    if isinstance(instr, UnOp):
+        return (resolve(instr.operand, True),)
+    if isinstance(instr, StackOp):
+        return (resolve(instr.expr, instr.op.type in [POP, POPQ]),)
+    if isinstance(instr, CallQOp):
+        return (resolve(instr.call_addr),)
+    if isinstance(instr, JmpStmt):
+        return (resolve(instr.jmpaddr),)
+    return ()
@@ -0,0 +1,207 @@
+# -*- coding:utf8 -*-
+"""
+Profiling of the guest program.
+
+The profiler wraps the execution of every entry of the code table, counting
+the entries executed: an entry runs one frame, or a whole block for the
+JIT, so the count of every frame follows from the counts of the entries.
+Calls and returns move along a call tree whose nodes count the frames
+executed in them, which gives the exclusive and inclusive counts of every
+function and its collapsed stacks. Without profiler, the interpreter runs
+its usual loop and nothing of this is executed.
+"""
+from collections import Counter
+from ..syntax_analysis.tree import CallQOp, RetStmt
+
+CALL = 1
+RET = 2
+
+
+class CallNode():
+    """ A function in the call tree, under the function calling it. """
+    __slots__ = ('name', 'parent', 'children', 'count')
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = {}
+        self.count = 0
+
+    def child(self, name):
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = CallNode(name, self)
+        return node
+
+
+def opcode(instr):
+    """ The name of the operation of an instruction. """
+    op = getattr(instr, 'op', None)
+    if op is not None:
+        return op.type
+    return type(instr).__name__
+
+
+class Profiler():
+    """ Execution counts of the guest program, per program counter, opcode
+    and function.
+    """
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.program = []
+        self.hits = []
+        self.steps = []
+        self.kinds = []
+        self.names = []
+        self.frames = Counter()
+        self.root = CallNode(None)
+        self.node = None
+
+    def load(self, program):
+        """ Prepares the tables of a new program image. The counts gathered
+        on the previous one are kept by program counter.
+        """
+        self.flush()
+        memory = self.interpreter.memory
+        self.program = program
+        self.hits[:] = [0] * (len(program) + 1)
+        self.steps[:] = [0] * (len(program) + 1)
+        self.kinds[:] = [CALL if isinstance(frame.instr, CallQOp) else
+                         RET if isinstance(frame.instr, RetStmt) else 0
+                         for frame in program] + [0]
+        self.names[:] = [None] * (len(program) + 1)
+        for (start, end), name in memory.ranges.items():
+            for index in range(memory.indexes[start], memory.indexes[end] + 1):
+                self.names[index] = name.value
+
+    def flush(self):
+        """ Adds the counts of the entries to the counts of their frames. """
+        weights = self.interpreter.weights
+        for index, hits in enumerate(self.hits):
+            if hits:
+                for frame in self.program[index:index + weights[index]]:
+                    self.frames[frame] += hits
+        for frame, steps in zip(self.program, self.steps):
+            if steps:
+                self.frames[frame] += steps
+        self.hits[:] = [0] * len(self.hits)
+        self.steps[:] = [0] * len(self.steps)
+
+    def wrap(self, run, weights):
+        """ Wraps `run`, the function executing an entry of the code whose
+        `weights` are given, so as to count the entries executed and follow
+        the calls and returns. An entry is counted before it runs, as a call
+        may link a function and rebuild the tables; the entry ending the
+        execution is counted as well. Entries of the code executing one frame
+        each, when stepping through the JIT, are counted apart.
+        """
+        hits = self.hits if weights is self.interpreter.weights else self.steps
+        kinds = self.kinds
+        names = self.names
+
+        def profiled(index):
+            node = self.node
+            if node is None:
+                node = self.node = self.root.child(names[index])
+            kind = kinds[index]
+            hits[index] += 1
+            try:
+                next_index = run(index)
+            finally:
+                node.count += weights[index]
+            if kind == CALL:
+                self.node = node.child(names[next_index])
+            elif kind == RET:
+                self.node = node.parent
+            return next_index
+        return profiled
+
+    ###########################################################################
+    #  Reports                                                                #
+    ###########################################################################
+
+    def counts(self):
+        """ Executions of every frame, by program counter. """
+        self.flush()
+        return Counter({frame.prog_counter: count for frame, count in self.frames.items()})
+
+    def opcodes(self):
+        """ Executions of every opcode. """
+        self.flush()
+        result = Counter()
+        for frame, count in self.frames.items():
+            result[opcode(frame.instr)] += count
+        return result
+
+    def walk(self):
+        """ Yields every node of the call tree below the root, with the list
+        of the names from the root to it, parents before children.
+        """
+        path = []
+        pending = [(child, 0) for child in self.root.children.values()]
+        while pending:
+            node, depth = pending.pop()
+            del path[depth:]
+            path.append(node.name)
+            yield node, path
+            pending.extend((child, depth + 1) for child in node.children.values())
+
+    def functions(self):
+        """ The (inclusive, exclusive) counts of every function. The calls a
+        function makes to itself are only counted once in its inclusive count.
+        """
+        exclusive = Counter()
+        inclusive = Counter()
+        active = Counter()
+        totals = {}
+        pending = [(child, False) for child in self.root.children.values()]
+        while pending:
+            node, done = pending.pop()
+            if done:
+                total = node.count + sum(totals.pop(child) for child in node.children.values())
+                totals[node] = total
+                active[node.name] -= 1
+                if not active[node.name]:
+                    inclusive[node.name] += total
+                continue
+            exclusive[node.name] += node.count
+            active[node.name] += 1
+            pending.append((node, True))
+            pending.extend((child, False) for child in node.children.values())
+        return {name: (inclusive[name], exclusive[name]) for name in exclusive}
+
+    def collapsed(self):
+        """ Yields the collapsed stacks, `caller;callee count` lines read by
+        flame graph tools.
+        """
+        for node, path in self.walk():
+            if node.count:
+                yield "%s %d\n" % (";".join(str(name) for name in path), node.count)
+
+    def write_collapsed(self, fname):
+        with open(fname, 'w') as stream:
+            stream.writelines(self.collapsed())
+
+    def report(self, limit=20):
+        """ The hot spots: the most executed frames, then the functions and
+        opcodes by decreasing count.
+        """
+        counts = self.counts()
+        total = sum(counts.values()) or 1
+        frames = {frame.prog_counter: frame for frame in self.frames}
+        lines = ["{} instructions executed".format(sum(counts.values())), "",
+                 "{:>12} {:>7}  {:<10} {:<16} {}".format(
+                     "count", "%", "address", "function", "instruction")]
+        for pc, count in counts.most_common(limit):
+            frame = frames[pc]
+            lines.append("{:>12} {:>6.2f}%  0x{:<8x} {:<16} {} {}".format(
+                count, 100 * count / total, pc, str(self.names[frame.index]),
+                opcode(frame.instr), ", ".join(repr(operand) for operand in frame.operands)))
+        lines += ["", "{:>12} {:>12}  {}".format("inclusive", "exclusive", "function")]
+        functions = sorted(self.functions().items(), key=lambda item: -item[1][0])
+        for name, (inclusive, exclusive) in functions[:limit]:
+            lines.append("{:>12} {:>12}  {}".format(inclusive, exclusive, name))
+        lines += ["", "{:>12}  {}".format("count", "opcode")]
+        for name, count in self.opcodes().most_common(limit):
+            lines.append("{:>12}  {}".format(count, name))
+        return "\n".join(lines)
@@ -0,0 +1,147 @@
+# -*- coding:utf8 -*-
+"""
+Debugging sessions driven by asyncio.
+
+A session owns an interpreter and runs it cooperatively: frames are
+executed in slices of `slice_size`, the event loop getting the hand back
+between two slices. A single event loop can thus drive many independent
+sessions, none of them holding a thread while paused. Every time a session
+stops, the stop event is returned to the caller and queued for the
+`events` iterator, which keeps the EVENTS most recent ones. Slices run
+through `Interpreter.step`, so breakpoints stop the execution once their
+frame has run, as everywhere else.
+"""
+import asyncio
+from .interpreter import Interpreter, CLOSURE, BUDGET, BREAKPOINT, UNTIL, END
+
+STEP = 'step'
+ERROR = 'error'
+
+EVENTS = 64
+
+
+class StopEvent():
+    """ Why and where a session stopped: `reason` is one of STEP,
+    BREAKPOINT, UNTIL, END and ERROR, `prog_counter` the address of the
+    next frame to execute and `executed` the number of frames executed since
+    the start. `result` holds rax at the end, `error` the exception raised.
+    """
+    def __init__(self, reason, prog_counter, executed, result=None, error=None):
+        self.reason = reason
+        self.prog_counter = prog_counter
+        self.executed = executed
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        pc = "None" if self.prog_counter is None else "0x%x" % self.prog_counter
+        return "StopEvent({}, {}, executed={})".format(self.reason, pc, self.executed)
+
+
+class DebugSession():
+    """ A paused execution of the function `entry` of a program, which stops
+    after the frames at the `break_points` addresses.
+    """
+    def __init__(self, tree, entry='main', mode=CLOSURE, break_points=(), slice_size=1000):
+        self.interpreter = Interpreter([], mode=mode)
+        self.interpreter.single_step = True
+        self.memory = self.interpreter.memory
+        self.interpreter.start(tree, entry)
+        self.break_points = set(break_points)
+        self.slice_size = slice_size
+        self.stopped = None
+        self.lock = None
+        self.queue = None
+
+    def bind(self):
+        """ Creates the lock and the event queue in the running event loop,
+        the session possibly being built before it starts.
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+            self.queue = asyncio.Queue(EVENTS)
+
+    @property
+    def executed(self):
+        """ Number of frames executed since the start. """
+        return self.interpreter.executed
+
+    @property
+    def prog_counter(self):
+        """ Address of the next frame to execute, None once stopped for good. """
+        index = self.interpreter.index
+        if self.finished or index >= len(self.memory.program):
+            return None
+        return self.memory.program[index].prog_counter
+
+    @property
+    def finished(self):
+        return self.stopped is not None and self.stopped.reason in [END, ERROR]
+
+    async def step(self, count=1):
+        """ Executes `count` frames, or fewer if a breakpoint is reached. """
+        return await self.resume(count)
+
+    async def continue_(self):
+        """ Executes until a breakpoint or the end of the execution. """
+        return await self.resume(None)
+
+    async def run_until(self, prog_counter):
+        """ Executes until the frame at `prog_counter`, stopping before it, a
+        breakpoint or the end of the execution.
+        """
+        if prog_counter not in self.memory.indexes:
+            raise ValueError("No instruction at address 0x%x" % prog_counter)
+        return await self.resume(None, prog_counter)
+
+    async def events(self):
+        """ Yields the stop events as they happen, until the execution ends. """
+        self.bind()
+        while True:
+            event = await self.queue.get()
+            yield event
+            if event.reason in [END, ERROR]:
+                return
+
+    async def resume(self, count, until=None):
+        """ Executes slice after slice until `count` frames are executed (no
+        limit if None) or the execution stops, and returns the stop event.
+        """
+        self.bind()
+        async with self.lock:
+            if self.finished:
+                return self.stopped
+            remaining = count
+            while True:
+                budget = self.slice_size if remaining is None else min(remaining, self.slice_size)
+                executed, event = self.run_slice(budget, until)
+                if remaining is not None:
+                    remaining -= executed
+                    if event is None and not remaining:
+                        event = StopEvent(STEP, self.prog_counter, self.executed)
+                if event is not None:
+                    break
+                await asyncio.sleep(0)
+            self.stopped = event
+            if self.queue.full():
+                self.queue.get_nowait()
+            self.queue.put_nowait(event)
+            return event
+
+    def run_slice(self, budget, until=None):
+        """ Executes up to `budget` frames, stopping after a breakpoint or
+        before the frame at `until`. Returns the number of frames executed and
+        the stop event, None if the budget ran out.
+        """
+        interpreter = self.interpreter
+        executed = interpreter.executed
+        try:
+            stop = interpreter.step(budget, self.break_points, until)
+        except Exception as exception:
+            prog_counter = self.memory.program[interpreter.index].prog_counter
+            return (interpreter.executed - executed,
+                    StopEvent(ERROR, prog_counter, self.executed, error=exception))
+        if stop.reason == BUDGET:
+            return stop.executed, None
+        return stop.executed, StopEvent(stop.reason, stop.prog_counter, self.executed,
+                                        stop.result)
@@ -0,0 +1,131 @@
+# -*- coding:utf8 -*-
+"""
+Binary traces of the execution.
+
+A trace is a header followed by fixed-width records of three unsigned 64
+bits words, `(header, a, b)`, the low two bits of `header` giving the kind
+of the record and the others its field:
+- STEP: the frame of index `field` at address `a` is executed;
+- REGISTER: the register slot `field` now holds `a`;
+- WRITE: `field` bytes holding `b` are written at address `a`;
+- FLAG: the comparison flag now holds `a`.
+The writes of a frame follow its step record, and its register and flag
+changes follow its writes. Records are gathered in an array flushed to the
+file every `chunk` records, so that the memory used does not depend on the
+length of the execution.
+"""
+import sys
+from array import array
+from struct import Struct
+from .memory import MASKS, ADDRESS_MASK, SLOTS
+
+STEP, REGISTER, WRITE, FLAG = range(4)
+
+MAGIC = b'ASMTRACE'
+HEADER = Struct('<8sB7x')
+WIDTH = 3
+WORD_MASK = 2**64 - 1
+
+
+class TraceRecorder():
+    """ Records the execution of an interpreter into the file `fname`. """
+
+    def __init__(self, fname, chunk=2**16):
+        self.stream = open(fname, 'wb')
+        self.stream.write(HEADER.pack(MAGIC, sys.byteorder == 'little'))
+        self.buffer = array('Q')
+        self.limit = chunk * WIDTH
+        self.interpreter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def attach(self, interpreter):
+        """ Records the memory writes of `interpreter`. Must be called before
+        its code is compiled, which binds the store function.
+        """
+        self.interpreter = interpreter
+        stack = interpreter.memory.stack
+        store = stack.store
+        extend = self.buffer.extend
+
+        def recorded_store(address, value, size):
+            extend((WRITE | size << 2, address & ADDRESS_MASK, value & MASKS[size]))
+            store(address, value, size)
+        stack.store = recorded_store
+
+    def wrap(self, run):
+        """ Wraps `run`, the function executing an entry of the code, so as
+        to record a step per frame and the registers and flag it changes.
+        """
+        memory = self.interpreter.memory
+        slots = memory.registers._slots
+        last = array('Q', slots)
+        flag = memory.cmp_reg
+        buffer = self.buffer
+        extend = buffer.extend
+        limit = self.limit
+
+        def recorded(index):
+            nonlocal flag
+            program = memory.program
+            if index < len(program):
+                extend((STEP | index << 2, program[index].prog_counter, 0))
+            try:
+                return run(index)
+            finally:
+                if slots != last:
+                    self.registers(slots, last)
+                if memory.cmp_reg != flag:
+                    flag = memory.cmp_reg
+                    extend((FLAG, flag & WORD_MASK, 0))
+                if len(buffer) >= limit:
+                    self.flush()
+        return recorded
+
+    def registers(self, slots, last):
+        """ Records the register slots differing from `last`, and updates it. """
+        for slot in range(len(SLOTS)):
+            if slots[slot] != last[slot]:
+                self.buffer.extend((REGISTER | slot << 2, slots[slot], 0))
+        last[:] = slots
+
+    def flush(self):
+        self.buffer.tofile(self.stream)
+        del self.buffer[:]
+        self.stream.flush()
+
+    def close(self):
+        if not self.stream.closed:
+            self.flush()
+            self.stream.close()
+
+
+def read_trace(fname, chunk=2**16):
+    """ Yields the records of a trace as `(kind, field, a, b)` tuples, the
+    flag being signed again. The file is read `chunk` records at a time.
+    """
+    with open(fname, 'rb') as stream:
+        magic, little = HEADER.unpack(stream.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("%s is not a trace" % fname)
+        swap = bool(little) != (sys.byteorder == 'little')
+        while True:
+            words = array('Q')
+            try:
+                words.fromfile(stream, chunk * WIDTH)
+            except EOFError:
+                pass
+            if not words:
+                return
+            if swap:
+                words.byteswap()
+            for position in range(0, len(words), WIDTH):
+                header, a, b = words[position:position + WIDTH]
+                kind = header & 3
+                if kind == FLAG and a >> 63:
+                    a -= 2**64
+                yield kind, header >> 2, a, b
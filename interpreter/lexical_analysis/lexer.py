@@ -1,5 +1,6 @@
 # -*- coding:utf8 -*-
 """ SAI - Simple Assembly Interpreter """
+import re
 from string import hexdigits
 from .token_type import PUSH, PUSHQ, POP, POPQ, SUB_OP, MOV, MOVL, XOR_OP, AND_OP, CALLQ
 from .token_type import SHL_OP, SHR_OP
@@ -54,6 +55,23 @@ RESERVED_KEYWORDS = {
     'test': Token(TEST, 'test'),
 }
 
+TOKENS = {}
+INTERNED = 2**16
+
+def intern(ttype, value):
+    """ The shared token of an operand: tokens are never modified, so that
+    every occurrence of a register or number can use the same one. The table
+    is emptied once it holds INTERNED tokens, so that long-lived processes
+    lexing many programs do not keep every value they ever saw.
+    """
+    key = (ttype, value)
+    token = TOKENS.get(key)
+    if token is None:
+        if len(TOKENS) >= INTERNED:
+            TOKENS.clear()
+        token = TOKENS[key] = Token(ttype, value)
+    return token
+
 class LexicalError(Exception):
     """ Class was created to isolate lexical errors """
 
@@ -61,177 +79,71 @@ def error(message):
     """ Raise an error. """
     raise LexicalError(message)
 
+OPERAND_TOKENS = re.compile(
+    r"\s*(?:%([A-Za-z0-9_]+)|(-[0-9a-fA-Fx]*|[0-9][0-9a-fA-Fx]*)|([*$(),:])|(\S))"
+)
+
+RAW_BYTES = re.compile(r"(?:[0-9a-f]{2} )+\s*")
+
+SYMBOLS = {
+    '*': Token(ASTERISK, '*'),
+    '$': Token(DOLLAR, '$'),
+    '(': Token(LPAREN, '('),
+    ')': Token(RPAREN, ')'),
+    ',': Token(COMMA, ','),
+    ':': Token(COLON, ':'),
+}
+
 class OperationLexer():
-    """ Lexer for an assembly operation. """
+    """ Lexer for an assembly operation.
+    The line is split on the tabs objdump puts between the address, the
+    encoded bytes and the instruction, whatever the width of the bytes
+    column, and the operands are matched by a precompiled regex.
+    """
     def __init__(self, line, line_data):
-        self.pos = 0
         self.line = line
-        self.current_line = line_data
-        self.current_char = self.current_line[0]
+        self.pc = None
         self.tokens = []
-        self.parse_operation()
-
-
-    def advance(self):
-        """ Advance the `pos` pointer and set the `current_char` variable. """
-        self.pos += 1
-        if self.pos >= len(self.current_line):
-            self.current_char = None
-            return False
-        self.current_char = self.current_line[self.pos]
-        return True
-
-    def peek(self, n_pos):
-        """ Check next n-th char but don't change state. """
-
-        peek_pos = self.pos + n_pos
-        if peek_pos > len(self.current_line) - 1:
-            self.current_char = None
-            return None
-        return self.current_line[peek_pos]
-
-    def skip(self, n_pos):
-        """ Advance the `pos` pointer of `n` chars, and set the `current_char`
-        variable.
-        """
-        self.pos += n_pos
-        if self.pos >= len(self.current_line):
-            return False
-        self.current_char = self.current_line[self.pos]
-        return True
+        self.parse_operation(line_data)
 
-    def skip_whitespace(self):
-        """ Skip all whitespaces between tokens from input """
-        while self.current_char is not None and self.current_char.isspace():
-            if self.current_char == '\n':
-                return False
-            self.advance()
-
-    def skip_comment(self):
-        """ Skip all whitespaces between tokens from input """
-        while self.current_char is not None:
-            if self.current_char == '\n':
-                return False
-            self.advance()
-
-
-    def number(self):
-        """ Returns a number written either in hexadecimal or in decimal """
-        result = ''
-        if self.current_char == "-":
-            result = "-"
-            self.advance()
-        while self.current_char is not None and \
-              (self.current_char in hexdigits \
-               or self.current_char == 'x'):
-            result += self.current_char
-            self.advance()
-        token = Token(NUMBER, result)
-        return token
-
-    def _id(self, register=False):
-        """ Handle identifiers and reserved keywords """
-        result = ''
-        if self.current_char == '<':
-            self.advance()
-        while self.current_char is not None and (self.current_char.isalnum()\
-                                                 or self.current_char == '_'):
-            result += self.current_char
-            self.advance()
-        if register:
-            token = Token(REGISTER, result)
-        else:
-            token = RESERVED_KEYWORDS.get(result, Token(ID, result))
-
-        return token
-
-    def tokenize_operands(self):
-        """ Tokenize the operands of an asm operation. """
-        res = []
-        while self.current_char is not None:
-            if self.current_char == '\n':
-                return res
-            next_token = self.get_next_token()
-            if next_token:
-                res.append(next_token)
-
-    def parse_operation(self):
+    def parse_operation(self, line_data):
         """ Tokenize an asm operation. """
-        self.skip_whitespace()
-        number = self.number()
-        self.pc = number
-        res = self.skip(24)
-        operation = self._id()
-        if not res:
-            self.tokens = None
-        if operation.value == '' or operation.type in [RETQ, HLT]:
-            self.tokens = [number, operation]
-            return
-        if operation.type == DATA16_OP:
-            self.tokens = [number, operation]
+        fields = line_data.split('\t')
+        self.pc = Token(NUMBER, fields[0].strip().rstrip(':'))
+        if len(fields) > 2:
+            instruction = fields[2]
+        elif len(fields) == 2 and not RAW_BYTES.fullmatch(fields[1]):
+            instruction = fields[1]
+        else:
+            instruction = ''
+        mnemonic, _, operands = instruction.partition(' ')
+        mnemonic = mnemonic.strip()
+        operation = RESERVED_KEYWORDS.get(mnemonic) or Token(ID, mnemonic)
+        self.tokens = [self.pc, operation]
+        if mnemonic == '' or operation.type in [RETQ, HLT, DATA16_OP]:
             return
-        self.skip_whitespace()
-        operands = self.tokenize_operands()
-        self.tokens = [number, operation] + operands
-
-    def get_next_token(self):
-        """ Lexical analyzer (also known as scanner or tokenizer)
-        This method is responsible for breaking a sentence
-        apart into tokens. One token at a time. """
-
-        while self.current_char is not None:
-
-            if self.current_char.isspace():
-                self.skip_whitespace()
-                continue
-
-            if self.current_char == '#':
-                self.skip_comment()
-                return False
-
-            if self.current_char == "%":
-                self.advance()
-                return self._id(register=True)
-
-            if self.current_char == "-":
-                return self.number()
-
-            if self.current_char.isdigit():
-                return self.number()
+        self.tokens += self.tokenize_operands(operands)
 
-            if self.current_char == '<':
-                self.skip_comment()
-                return False
-
-            if self.current_char == '*':
-                self.advance()
-                return Token(ASTERISK, '*')
-
-            if self.current_char == "$":
-                self.advance()
-                return Token(DOLLAR, "$")
-
-            if self.current_char == "(":
-                self.advance()
-                return Token(LPAREN, "(")
-
-            if self.current_char == ")":
-                self.advance()
-                return Token(RPAREN, ")")
-
-            if self.current_char == ',':
-                self.advance()
-                return Token(COMMA, ",")
-
-            if self.current_char == ':':
-                self.advance()
-                return Token(COLON, ":")
-
-            error(
-                message="Invalid char {} at line {}:{}({})".format(
-                    self.current_char, self.line, self.pos, self.current_line
+    def tokenize_operands(self, operands):
+        """ Tokenize the operands of an asm operation, up to the comment or
+        the symbol objdump may append.
+        """
+        operands = operands.partition('#')[0].partition('<')[0]
+        res = []
+        for register, number, symbol, invalid in OPERAND_TOKENS.findall(operands):
+            if register:
+                res.append(intern(REGISTER, register))
+            elif number:
+                res.append(intern(NUMBER, number))
+            elif symbol:
+                res.append(SYMBOLS[symbol])
+            else:
+                error(
+                    message="Invalid char {} at line {}:{}({})".format(
+                        invalid, self.line, operands.index(invalid), operands
+                    )
                 )
-            )
+        return res
 
 class SectionLexer():
     """ Lexer for an assembly section. """
@@ -248,6 +160,8 @@ class SectionLexer():
         self.operations = []
         self.start_addr = -1
         self.res = self.parse_section()
+        self.code = None
+        self.start_line = self.current_line = None
 
     def parse_section(self):
         """ Parses the information describing a section. """
@@ -324,59 +238,49 @@ class SectionLexer():
                 self.current_line = None
 
 
+SECTION_NAME = re.compile(r"<([A-Za-z0-9_]*)")
+
+def iter_shards(text_lines, source_func):
+    """ Reads a disassembly line by line, from any iterable of lines such as
+    an open file or a pipe, and yields `(line, lines)` for every section of
+    `source_func` (of the whole file if None) as soon as it is complete: the
+    number of its header line and its lines. Only the lines of the current
+    section are held, and those of the other sections are not kept at all.
+    """
+    section = None
+    start_line = 0
+    for number, line in enumerate(text_lines, 1):
+        if section is not None:
+            if line.strip():
+                if section:
+                    section.append(line)
+                continue
+            if section:
+                yield start_line, section
+            section = None
+        elif line[:1].isdigit():
+            start_line = number
+            name = SECTION_NAME.search(line)
+            if name and (source_func is None or name.group(1) in source_func):
+                section = [line]
+            else:
+                section = []
+    if section:
+        yield start_line, section
+
+def iter_sections(text_lines, source_func):
+    """ Yields the lexer of every section of `source_func`, as soon as it is
+    read.
+    """
+    for start_line, section in iter_shards(text_lines, source_func):
+        lexer = SectionLexer(start_line, section, source_func)
+        if lexer.res:
+            yield lexer
+
+
 class Lexer():
     """ The assembly lexer. """
     def __init__(self, text_lines, source_func):
-        self.text_lines = text_lines
         self.source_func = source_func
-        self.pos = 0
         self.line = 0
-        self.section = 0
-        self.sections = [[]]
-        self.current_line = ""
-        self.current_char = ''
-        self.parse_file()
-
-    def accumulate_next_section(self):
-        """ Accumulate the operations of the next section. """
-        start_line = self.line + 1
-        while self.current_char != '\n':
-            self.sections[-1].append(self.current_line)
-            self.line += 1
-            if self.line >= len(self.text_lines):
-                break
-            else:
-                self.current_line = self.text_lines[self.line]
-                self.current_char = self.current_line[0]
-                self.pos = 0
-        self.sections[-1] = SectionLexer(start_line, self.sections[-1],
-                                         self.source_func)
-        if not self.sections[-1].res:
-            self.sections[-1] = []
-        self.sections += [[]]
-
-    def skip_disassemble_comment(self):
-        """ Skip unnecessary data from dissasembly."""
-        self.line += 1
-        self.current_line = self.text_lines[self.line]
-        self.pos = 0
-        self.current_char = self.current_char[0]
-
-    def parse_file(self):
-        """ Parses the whole file. """
-        while self.line < len(self.text_lines):
-            if self.line >= len(self.text_lines):
-                return
-            self.current_line = self.text_lines[self.line]
-            self.pos = 0
-            self.current_char = self.current_line[self.pos]
-            if self.current_line[0].isalpha():
-                self.skip_disassemble_comment()
-            elif self.current_line[0].isdigit():
-                self.accumulate_next_section()
-            elif self.current_char == '\n':
-                self.line += 1
-                self.current_line = self.text_lines[self.line]
-                self.pos = 0
-                self.current_char = self.current_char[0]
-        self.sections = [sec for sec in self.sections if isinstance(sec, SectionLexer)]
+        self.sections = list(iter_sections(text_lines, source_func))
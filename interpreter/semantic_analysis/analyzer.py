@@ -47,6 +47,7 @@ class SemanticAnalyzer(NodeVisitor):
 
     def __init__(self):
         self.current_scope = None
+        self.line = None
 
     def visit_Program(self, node):
         global_scope = ScopedSymbolTable(
@@ -79,6 +80,7 @@ class SemanticAnalyzer(NodeVisitor):
         self.current_scope.insert(sec_symbol)
 
         for content in node.content:
+            self.line = content.line
             self.visit(content)
 
     def visit_Register(self, node):
@@ -86,7 +88,7 @@ class SemanticAnalyzer(NodeVisitor):
         reg_name = node.value
         if not self.current_scope.lookup(reg_name):
             error(
-                "Error: Unknown register '{}' found at line {}".format(reg_name, node.line)
+                "Error: Unknown register '{}' found at line {}".format(reg_name, self.line)
             )
         return SemanticAnalyzer.Sizes(reg_name[0])
 
@@ -172,3 +174,12 @@ class SemanticAnalyzer(NodeVisitor):
     def analyze(tree):
         semantic_analyzer = SemanticAnalyzer()
         semantic_analyzer.visit(tree)
+
+    @staticmethod
+    def analyze_section(section):
+        semantic_analyzer = SemanticAnalyzer()
+        semantic_analyzer.current_scope = ScopedSymbolTable(
+            scope_name='global',
+            scope_level=1,
+        )
+        semantic_analyzer.visit(section)
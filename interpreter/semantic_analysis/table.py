@@ -85,6 +85,14 @@ REGISTERS = [
     ('r15d', RegisterSymbol('r15d', 0)),
 ]
 
+# Narrower views of the canonical registers.
+REGISTERS += [(name, RegisterSymbol(name, 0)) for name in [
+    'al', 'ah', 'bl', 'bh', 'cl', 'ch', 'dl', 'dh',
+    'ebp', 'si', 'di', 'bp', 'sp', 'sil', 'dil', 'bpl', 'spl',
+    'r8w', 'r9w', 'r10w', 'r11w', 'r12w', 'r13w', 'r14w', 'r15w',
+    'r8b', 'r9b', 'r10b', 'r11b', 'r12b', 'r13b', 'r14b', 'r15b',
+]]
+
 class ScopedSymbolTable(object):
     def __init__(self, scope_name, scope_level, enclosing_scope=None):
         self._symbols = OrderedDict(REGISTERS)
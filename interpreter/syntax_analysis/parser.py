@@ -1,5 +1,10 @@
 # -*- coding:utf8 -*-
 """ SCI - Simple C Interpreter """
+import gc
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from ..lexical_analysis.token_type import ID
 from ..lexical_analysis.token_type import XOR_OP, AND_OP, ADD_OP, ADDL_OP, SUB_OP, MUL_OP
@@ -13,8 +18,25 @@ from ..lexical_analysis.token_type import CALLQ, HLT, RETQ
 from ..lexical_analysis.token_type import NOP, NOPW, NOPL, XCHG, DATA16_OP
 from ..lexical_analysis.token_type import REGISTER
 from ..lexical_analysis.token_type import COMMA, DOLLAR, LPAREN, RPAREN, NUMBER, ASTERISK
+from ..lexical_analysis.lexer import Lexer, SectionLexer, SECTION_NAME, iter_shards, INTERNED
 from .tree import *
 
+OPERANDS = {}
+
+def operand(cls, token):
+    """ The shared `Register` or `AddrExpression` node of a token. These
+    nodes are never modified and are shared by every instruction using
+    them, so they do not carry a position. As the tokens, the table is
+    emptied once it holds INTERNED nodes.
+    """
+    key = (cls, token.type, token.value)
+    node = OPERANDS.get(key)
+    if node is None:
+        if len(OPERANDS) >= INTERNED:
+            OPERANDS.clear()
+        node = OPERANDS[key] = cls(token, prog_counter=None, line=None)
+    return node
+
 class ProgrammSyntaxError(Exception):
     """ A syntax error in the assembly program. """
 
@@ -26,7 +48,9 @@ class Parser():
     """ The effective Assembly parser, which relies on the lexer. """
     def __init__(self, lexer):
         self.lexer = lexer
-        self.current_token_line = []
+        self.tokens = []
+        self.pos = 0
+        self.end = 0
         self.current_token = None
 
     def eat(self, token_type):
@@ -34,10 +58,10 @@ class Parser():
         type and if they match then "eat" the current token
         and assign the next token to the self.current_token,
         otherwise raise an exception. """
-        if self.current_token.type == token_type and self.current_token_line:
-            self.current_token_line.pop(0)
-            if self.current_token_line:
-                self.current_token = self.current_token_line[0]
+        if self.current_token.type == token_type and self.pos < self.end:
+            self.pos += 1
+            if self.pos < self.end:
+                self.current_token = self.tokens[self.pos]
                 return True
             return False
         error(
@@ -89,7 +113,9 @@ class Parser():
         for operation in operations:
             line = operation.line
             prog_counter = int(operation.pc.value, 16)
-            self.current_token_line = operation.tokens[1:]
+            self.tokens = operation.tokens
+            self.pos = 1
+            self.end = len(self.tokens)
             oper = self.operation(prog_counter=prog_counter, line=line)
             if oper:
                 result.append(oper)
@@ -99,34 +125,10 @@ class Parser():
         """
         operation                   : operator addr_expression{,2}
         """
-        self.current_token = self.current_token_line[0]
-        if self.current_token.type is CALLQ:
-            return self.callqop(prog_counter, line)
-        if self.current_token.type in [SUB_OP, XOR_OP, AND_OP, ADD_OP, ADDL_OP,
-                                       SHL_OP, TEST]:
-            return self.binop(prog_counter, line)
-        if self.current_token.type is MUL_OP:
-            return self.ternaryop(prog_counter, line)
-        if self.current_token.type in [NOT_OP, NEG_OP, DEC_OP, INC_OP]:
-            return self.unop(prog_counter, line)
-        if self.current_token.type is LEA_OP:
-            return self.binop(prog_counter, line)
-        if self.current_token.type in [JL, JG, JGE, JLE, JE, JNE, JMP, JMPQ]:
-            return self.jmpop(prog_counter, line)
-        if self.current_token.type in [CMP_OP, CMPL_OP, CMPB_OP]:
-            return self.cmpop(prog_counter, line)
-        if self.current_token.type in [POP, POPQ, PUSH, PUSHQ]:
-            return self.stackop(prog_counter, line)
-        if self.current_token.type in [MOV, MOVL]:
-            return self.movop(prog_counter, line)
-        if self.current_token.type in [NOP, NOPW, NOPL, DATA16_OP]:
-            return self.noop(prog_counter, line)
-        if self.current_token.type is XCHG:
-            return self.xchgop(prog_counter, line)
-        if self.current_token.type is HLT:
-            return self.hltop(prog_counter, line)
-        if self.current_token.type is RETQ:
-            return self.retqop(prog_counter, line)
+        self.current_token = self.tokens[self.pos]
+        handler = self.OPERATIONS.get(self.current_token.type)
+        if handler is not None:
+            return handler(self, prog_counter, line)
         if self.current_token.type is ID:
             return None
         error("Unkown operation {} at line {}"
@@ -140,7 +142,7 @@ class Parser():
         """
         operation = self.current_token
         self.eat(operation.type)
-        if self.current_token_line:
+        if self.pos < self.end:
             call_addr = self.addr_expression(prog_counter, line)
             if self.current_token.type is COMMA:
                 error("incompatible operand with callq operator at line {}"
@@ -150,7 +152,7 @@ class Parser():
                   .format(self.lexer.line))
         return CallQOp(
             call_addr=call_addr,
-            ret_addr=str(int(prog_counter, 16)+0x8),
+            ret_addr=None,
             prog_counter=prog_counter,
             line=line
         )
@@ -311,7 +313,7 @@ class Parser():
         """
         operation = self.current_token
         self.eat(operation.type)
-        if self.current_token_line:
+        if self.pos < self.end:
             _ = self.addr_expression(prog_counter, line)
         return NullOp(
             op=operation,
@@ -361,10 +363,9 @@ class Parser():
         """
         operation = self.current_token
         self.eat(operation.type)
-        if self.current_token_line:
+        if self.pos < self.end:
             _ = self.addr_expression(prog_counter, line)
-        return NullOp(
-            op=operation,
+        return RetStmt(
             prog_counter=prog_counter,
             line=line,
         )
@@ -378,12 +379,12 @@ class Parser():
             if self.current_token.type is NUMBER:
                 token = self.current_token
                 self.eat(NUMBER)
-                return AddrExpression(token, prog_counter, line)
+                return operand(AddrExpression, token)
             error("Invalid offset at line %s" % line)
         if self.current_token.type is REGISTER:
             token = self.current_token
             self.eat(REGISTER)
-            return Register(token, prog_counter, line)
+            return operand(Register, token)
         if self.current_token.type is NUMBER:
             token = self.current_token
             self.eat(NUMBER)
@@ -395,9 +396,7 @@ class Parser():
                     second_reg = self.addr_expression(prog_counter, line)
                     if self.current_token.type is COMMA:
                         self.eat(COMMA)
-                        number = AddrExpression(self.current_token,
-                                                prog_counter=prog_counter,
-                                                line=line)
+                        number = operand(AddrExpression, self.current_token)
                         self.eat(NUMBER)
                         self.eat(RPAREN)
                         return TernaryAddrExpression(
@@ -412,19 +411,19 @@ class Parser():
                 self.eat(RPAREN)
                 return CompoundAddrExpression(
                     token,
-                    AddrExpression(token, prog_counter, line),
+                    operand(AddrExpression, token),
                     register,
                     prog_counter,
                     line
                 )
-            return AddrExpression(token, prog_counter, line)
+            return operand(AddrExpression, token)
         if self.current_token.type is ASTERISK:
             token = self.current_token
             self.eat(ASTERISK)
             compound = self.addr_expression(prog_counter, line)
             return CompoundAddrExpression(
                 token,
-                AddrExpression(token.value, prog_counter, line),
+                operand(AddrExpression, token),
                 compound,
                 prog_counter,
                 line
@@ -438,9 +437,7 @@ class Parser():
                 second_reg = self.addr_expression(prog_counter, line)
                 if self.current_token.type is COMMA:
                     self.eat(COMMA)
-                    number = AddrExpression(self.current_token,
-                                            prog_counter=prog_counter,
-                                            line=line)
+                    number = operand(AddrExpression, self.current_token)
                     self.eat(NUMBER)
                     self.eat(RPAREN)
                     return TernaryAddrExpression(
@@ -454,7 +451,47 @@ class Parser():
                 error("Wrong compound expression")
             self.eat(RPAREN)
 
-
+    OPERATIONS = {
+        CALLQ: callqop,
+        SUB_OP: binop,
+        XOR_OP: binop,
+        AND_OP: binop,
+        ADD_OP: binop,
+        ADDL_OP: binop,
+        SHL_OP: binop,
+        SHR_OP: binop,
+        TEST: binop,
+        LEA_OP: binop,
+        MUL_OP: ternaryop,
+        NOT_OP: unop,
+        NEG_OP: unop,
+        DEC_OP: unop,
+        INC_OP: unop,
+        JL: jmpop,
+        JG: jmpop,
+        JGE: jmpop,
+        JLE: jmpop,
+        JE: jmpop,
+        JNE: jmpop,
+        JMP: jmpop,
+        JMPQ: jmpop,
+        CMP_OP: cmpop,
+        CMPL_OP: cmpop,
+        CMPB_OP: cmpop,
+        POP: stackop,
+        POPQ: stackop,
+        PUSH: stackop,
+        PUSHQ: stackop,
+        MOV: movop,
+        MOVL: movop,
+        NOP: noop,
+        NOPW: noop,
+        NOPL: noop,
+        DATA16_OP: noop,
+        XCHG: xchgop,
+        HLT: hltop,
+        RETQ: retqop,
+    }
 
     def parse(self):
         """
@@ -474,3 +511,60 @@ class Parser():
         node = self.program()
 
         return node
+
+
+def parse_shards(shards):
+    """ Lexes and parses a batch of `(line, lines)` sections, as yielded by
+    `iter_shards`, and returns them pickled. The cyclic garbage collector
+    is paused meanwhile: it only slows down building many small objects.
+    """
+    source_func = {SECTION_NAME.search(lines[0]).group(1) for _, lines in shards}
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        lexer = Lexer([], source_func)
+        lexer.sections = [section for section in
+                          (SectionLexer(start_line, lines, source_func)
+                           for start_line, lines in shards)
+                          if section.res]
+        return pickle.dumps(Parser(lexer).sections(), pickle.HIGHEST_PROTOCOL)
+    finally:
+        if enabled:
+            gc.enable()
+
+def load_shards(data):
+    """ Unpickles sections returned by `parse_shards`. """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        if enabled:
+            gc.enable()
+
+def parse_parallel(text_lines, source_func, workers=None, batch_lines=2**14):
+    """ Lexes and parses the sections of a disassembly across a pool of
+    `workers` processes, and merges them into a single program in address
+    order. Sections are sent in batches of about `batch_lines` lines, and
+    at most two batches per worker are in flight while reading.
+    """
+    workers = workers or os.cpu_count() or 1
+    sections = []
+    pending = deque()
+    with ProcessPoolExecutor(workers) as executor:
+        batch, size = [], 0
+        for shard in iter_shards(text_lines, source_func):
+            batch.append(shard)
+            size += len(shard[1])
+            if size < batch_lines:
+                continue
+            pending.append(executor.submit(parse_shards, batch))
+            batch, size = [], 0
+            if len(pending) >= 2 * workers:
+                sections += load_shards(pending.popleft().result())
+        if batch:
+            pending.append(executor.submit(parse_shards, batch))
+        for future in pending:
+            sections += load_shards(future.result())
+    sections.sort(key=lambda section: section.prog_counter)
+    return Program(sections=sections, prog_counter=0, line=0)
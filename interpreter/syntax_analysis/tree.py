@@ -2,15 +2,19 @@
 import sys
 
 class Node(object):
+    __slots__ = ('line', 'prog_counter')
+
     def __init__(self, prog_counter, line):
         self.line = line
         self.prog_counter = prog_counter
 
 
 class NoOp(Node):
-    pass
+    __slots__ = ()
 
 class Section(Node):
+    __slots__ = ('name', 'content')
+
     def __init__(self, name, prog_counter, content, line):
         Node.__init__(self, prog_counter, line)
         self.prog_counter = prog_counter # A struct name
@@ -18,12 +22,16 @@ class Section(Node):
         self.content = content
 
 class AddrExpression(Node):
+    __slots__ = ('token', 'value')
+
     def __init__(self, token, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = token
         self.value = token.value
 
 class TernaryAddrExpression(Node):
+    __slots__ = ('token', 'reg_1', 'reg_2', 'offset', 'value')
+
     def __init__(self, token, reg_1, reg_2, offset, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = token
@@ -32,6 +40,8 @@ class TernaryAddrExpression(Node):
         self.value = token.value
 
 class CompoundAddrExpression(Node):
+    __slots__ = ('token', 'offset', 'register')
+
     def __init__(self, token, offset, register, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = token
@@ -39,12 +49,16 @@ class CompoundAddrExpression(Node):
         self.register = register
 
 class Register(Node):
+    __slots__ = ('token', 'value')
+
     def __init__(self, token, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = token
         self.value = token.value
 
 class BinOp(Node):
+    __slots__ = ('left', 'token', 'op', 'right')
+
     def __init__(self, left, op, right, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.left = left
@@ -52,6 +66,8 @@ class BinOp(Node):
         self.right = right
 
 class TernOp(Node):
+    __slots__ = ('left', 'middle', 'token', 'op', 'right')
+
     def __init__(self, left, op, middle, right, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.left = left
@@ -60,12 +76,16 @@ class TernOp(Node):
         self.right = right
 
 class UnOp(Node):
+    __slots__ = ('operand', 'token', 'op')
+
     def __init__(self, operand, op, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.operand = operand
         self.token = self.op = op
 
 class XchgOp(Node):
+    __slots__ = ('left', 'token', 'op', 'right')
+
     def __init__(self, left, op, right, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.left = left
@@ -73,6 +93,8 @@ class XchgOp(Node):
         self.right = right
 
 class MovOp(Node):
+    __slots__ = ('left', 'token', 'op', 'right')
+
     def __init__(self, left, op, right, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.left = left
@@ -80,6 +102,8 @@ class MovOp(Node):
         self.right = right
 
 class CmpOp(Node):
+    __slots__ = ('left', 'token', 'op', 'right')
+
     def __init__(self, left, op, right, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.left = left
@@ -87,23 +111,31 @@ class CmpOp(Node):
         self.right = right
 
 class NullOp(Node):
+    __slots__ = ('token', 'op')
+
     def __init__(self, op, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = self.op = op
 
 class StackOp(Node):
+    __slots__ = ('token', 'op', 'expr')
+
     def __init__(self, op, expr, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = self.op = op
         self.expr = expr
 
 class CallQOp(Node):
+    __slots__ = ('call_addr',)
+
     def __init__(self, call_addr, ret_addr, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.call_addr = call_addr
 
 
 class JmpStmt(Node):
+    __slots__ = ('token', 'op', 'jmpaddr')
+
     def __init__(self, op, jmpaddr, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.token = self.op = op
@@ -111,12 +143,16 @@ class JmpStmt(Node):
         self.line = line
 
 class RetStmt(Node):
+    __slots__ = ()
+
     def __init__(self, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.prog_counter= prog_counter
         self.line = line
 
 class Program(Node):
+    __slots__ = ('children',)
+
     def __init__(self, sections, prog_counter, line):
         Node.__init__(self, prog_counter, line)
         self.children = sections
@@ -1,2 +1,4 @@
 # -*- coding:utf8 -*-
 from . import utils
+from . import cache
+from . import loader
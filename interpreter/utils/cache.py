@@ -0,0 +1,136 @@
+# -*- coding:utf8 -*-
+"""
+On-disk cache of checked programs.
+
+The front end (lexing, parsing and semantic analysis) is skipped when the
+same disassembly is run again: the `Program` tree is stored pickled and
+compressed, under a key hashing the disassembly, the functions loaded
+from it, the interpreter version and the CACHE_FORMAT of the trees.
+Entries are written to a temporary file renamed in place, so that
+concurrent processes only ever see whole entries, and the least recently
+used ones are evicted once the cache grows past its size bound.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from .. import __version__
+from ..lexical_analysis.lexer import Lexer
+from ..syntax_analysis.parser import Parser
+from ..semantic_analysis.analyzer import SemanticAnalyzer
+
+CACHE_DIR = os.environ.get(
+    'ASM_INTERPRETER_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'asm_interpreter')
+)
+CACHE_SIZE = 256 * 2**20
+SUFFIX = '.tree'
+# Version of the pickled trees: to bump whenever the layout of the tokens,
+# the nodes or their operands changes, so that older entries are not read.
+CACHE_FORMAT = 1
+
+
+def front_end(text_lines, source_func):
+    """ Lexes, parses and checks a disassembly. """
+    tree = Parser(Lexer(text_lines, source_func)).parse()
+    SemanticAnalyzer.analyze(tree)
+    return tree
+
+
+class ProgramCache():
+    """ A directory of checked programs, bounded to `max_size` bytes. """
+
+    def __init__(self, directory=CACHE_DIR, max_size=CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(fname, source_func):
+        """ Hashes the disassembly read by chunks, the loaded functions, the
+        interpreter version and the format of the trees.
+        """
+        digest = hashlib.sha256()
+        with open(fname, 'rb') as stream:
+            for chunk in iter(lambda: stream.read(2**16), b''):
+                digest.update(chunk)
+        digest.update('\0'.join(source_func).encode('utf8'))
+        digest.update(__version__.encode('utf8'))
+        digest.update(b'\0%d' % CACHE_FORMAT)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def program(self, fname, source_func):
+        """ The checked program of the disassembly `fname`, from the cache if
+        possible, else built and stored.
+        """
+        key = self.key(fname, source_func)
+        tree = self.get(key)
+        if tree is None:
+            with open(fname, 'r') as text:
+                tree = front_end(text, source_func)
+            self.put(key, tree)
+        return tree
+
+    def get(self, key):
+        """ The program stored under `key`, or None. A hit refreshes the
+        entry's position in the LRU order.
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as stream:
+                data = stream.read()
+            tree = pickle.loads(zlib.decompress(data))
+        except FileNotFoundError:
+            return None
+        except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError):
+            self.discard(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return tree
+
+    def put(self, key, tree):
+        """ Stores a program under `key`, then evicts entries if needed. """
+        data = zlib.compress(pickle.dumps(tree, pickle.HIGHEST_PROTOCOL))
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as stream:
+                stream.write(data)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            self.discard(temporary)
+            raise
+        self.evict()
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache fits in
+        `max_size`. Entries removed by another process are skipped.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.discard(path)
+            total -= size
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
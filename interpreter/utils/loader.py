@@ -0,0 +1,148 @@
+# -*- coding:utf8 -*-
+"""
+On-demand loading of the functions of a disassembly.
+
+The disassembly is only scanned up front, keeping the position of every
+section in the file and not its lines. A section is read, lexed, parsed
+and checked the first time it is needed: when it is reachable from the
+entry point through direct calls and jumps, or when the execution reaches
+it, e.g. through an indirect call. The file must thus not change while
+its functions are loaded.
+"""
+from bisect import bisect_right
+from ..lexical_analysis.lexer import Lexer, SectionLexer, SECTION_NAME
+from ..syntax_analysis.parser import Parser
+from ..syntax_analysis.tree import Program, AddrExpression, CallQOp, JmpStmt
+from ..semantic_analysis.analyzer import SemanticAnalyzer, error
+
+
+def iter_spans(stream):
+    """ Reads a disassembly opened in binary mode and yields `(name, address,
+    line, offset, length)` for every section, as `iter_shards` splits them:
+    its name and address, the number of its header line, and the position
+    and length of its lines in the file.
+    """
+    section = None
+    position = end = 0
+    for number, line in enumerate(stream, 1):
+        if section is not None:
+            if line.strip():
+                position = end = position + len(line)
+                continue
+            if section:
+                name, address, start_line, offset = section
+                yield name, address, start_line, offset, end - offset
+            section = None
+        elif line[:1].isdigit():
+            header = line.decode('utf8', 'replace')
+            match = SECTION_NAME.search(header)
+            section = False
+            if match:
+                section = (match.group(1), int(header.split()[0], 16), number, position)
+            end = position + len(line)
+        position += len(line)
+    if section:
+        name, address, start_line, offset = section
+        yield name, address, start_line, offset, end - offset
+
+
+class Loader():
+    """ The sections of the disassembly `fname`, loaded on demand. As when
+    the whole file is parsed, sections sharing a name, such as `main` and
+    `main.cold`, raise a SemanticError.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.spans = {}
+        self.sections = {}
+        addresses = []
+        with open(fname, 'rb') as stream:
+            for name, address, start_line, offset, length in iter_spans(stream):
+                if name in self.spans:
+                    error("Error: Duplicate identifier '{}' found at line {}".format(
+                        name, start_line))
+                self.spans[name] = (start_line, offset, length)
+                addresses.append((address, name))
+        addresses.sort()
+        self.starts = [address for address, _ in addresses]
+        self.names = [name for _, name in addresses]
+
+    def section(self, name):
+        """ The checked section `name`, lexed and parsed on first use. None
+        for sections without instructions.
+        """
+        if name not in self.sections:
+            start_line, lines = self.read(name)
+            lexer = Lexer([], [name])
+            lexer.sections = [section for section in
+                              [SectionLexer(start_line, lines, [name])]
+                              if section.res]
+            sections = Parser(lexer).sections()
+            section = sections[0] if sections and sections[0].content else None
+            if section is not None:
+                SemanticAnalyzer.analyze_section(section)
+            self.sections[name] = section
+            del self.spans[name]
+        return self.sections[name]
+
+    def read(self, name):
+        """ The number of the header line of the section `name` and its lines,
+        read from the file.
+        """
+        start_line, offset, length = self.spans[name]
+        with open(self.fname, 'rb') as stream:
+            stream.seek(offset)
+            data = stream.read(length)
+        return start_line, data.decode('utf8', 'replace').splitlines(True)
+
+    def name_at(self, address):
+        """ Name of the section `address` falls in, or None. """
+        position = bisect_right(self.starts, address) - 1
+        if position < 0:
+            return None
+        return self.names[position]
+
+    def targets(self, section):
+        """ Names of the sections directly called or jumped to. """
+        for instr in section.content:
+            if isinstance(instr, CallQOp):
+                target = instr.call_addr
+            elif isinstance(instr, JmpStmt):
+                target = instr.jmpaddr
+            else:
+                continue
+            if isinstance(target, AddrExpression):
+                name = self.name_at(int(target.value, 16))
+                if name is not None:
+                    yield name
+
+    def reachable(self, entry='main'):
+        """ Loads `entry` and the sections it reaches through direct calls
+        and jumps, and returns the program they make.
+        """
+        pending = [entry]
+        while pending:
+            name = pending.pop()
+            if name in self.sections or name not in self.spans:
+                continue
+            section = self.section(name)
+            if section is not None:
+                pending.extend(self.targets(section))
+        return self.program()
+
+    def load(self, address):
+        """ Loads the section containing `address`, and those it reaches.
+        Returns False if no section contains it.
+        """
+        name = self.name_at(address)
+        if name is None:
+            return False
+        self.reachable(name)
+        return True
+
+    def program(self):
+        """ The program made of the sections loaded so far. """
+        sections = [section for section in self.sections.values() if section is not None]
+        sections.sort(key=lambda section: section.prog_counter)
+        return Program(sections=sections, prog_counter=0, line=0)
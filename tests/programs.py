@@ -0,0 +1,82 @@
+# -*- coding:utf8 -*-
+"""
+Small disassemblies written out for the tests.
+"""
+from interpreter.lexical_analysis.lexer import Lexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+
+HEADER = ["\n", "test:     format de fichier elf64-x86-64\n", "\n", "\n",
+          "Déassemblage de la section .text :\n", "\n"]
+
+START = 0x401000
+
+FIB = [
+    ('fib', ["push   %rbp", "mov    %rsp,%rbp", "push   %rbx", "sub    $0x18,%rsp",
+             "mov    %edi,-0x14(%rbp)", "mov    -0x14(%rbp),%eax", "cmp    $0x1,%eax",
+             "jg     {recurse}", "mov    -0x14(%rbp),%eax", "jmp    {leave}",
+             "recurse:", "mov    -0x14(%rbp),%eax", "sub    $0x1,%eax", "mov    %eax,%edi",
+             "callq  {fib}", "mov    %eax,%ebx", "mov    -0x14(%rbp),%eax",
+             "sub    $0x2,%eax", "mov    %eax,%edi", "callq  {fib}", "add    %ebx,%eax",
+             "leave:", "add    $0x18,%rsp", "pop    %rbx", "pop    %rbp", "retq   "]),
+    ('main', ["push   %rbp", "mov    %rsp,%rbp", "mov    $0xa,%edi", "callq  {fib}",
+              "pop    %rbp", "retq   "]),
+]
+""" fib(10), returning 55 after 3188 frames. """
+
+
+def disassembly(functions):
+    """ The lines of the disassembly of `functions`, `(name, instructions)`
+    pairs laid out from START with four bytes per instruction. An instruction
+    `label:` names the address of the next one, and `{label}` stands for the
+    address of a label or of a function.
+    """
+    labels = {}
+    prog_counter = START
+    for name, instructions in functions:
+        start = prog_counter
+        labels[name] = "%x <%s>" % (prog_counter, name)
+        for text in instructions:
+            if text.endswith(':'):
+                labels[text[:-1]] = "%x <%s+0x%x>" % (prog_counter, name, prog_counter - start)
+            else:
+                prog_counter += 4
+    lines = list(HEADER)
+    prog_counter = START
+    for name, instructions in functions:
+        lines.append("%016x <%s>:\n" % (prog_counter, name))
+        for text in instructions:
+            if text.endswith(':'):
+                continue
+            lines.append("  %x:\t%-21s\t%s\n" % (prog_counter, "90", text.format(**labels)))
+            prog_counter += 4
+        lines.append("\n")
+    return lines
+
+
+def address(functions, label):
+    """ The address of `label` in the disassembly of `functions`. """
+    prog_counter = START
+    for name, instructions in functions:
+        if name == label:
+            return prog_counter
+        for text in instructions:
+            if text == label + ':':
+                return prog_counter
+            if not text.endswith(':'):
+                prog_counter += 4
+    raise KeyError(label)
+
+
+def tree(functions):
+    """ The checked tree of the disassembly of `functions`. """
+    lines = disassembly(functions)
+    tree = Parser(Lexer(lines, [name for name, _ in functions])).parse()
+    SemanticAnalyzer.analyze(tree)
+    return tree
+
+
+def write(path, functions):
+    """ Writes the disassembly of `functions` to `path`. """
+    with open(path, 'w', encoding='utf8') as stream:
+        stream.writelines(disassembly(functions))
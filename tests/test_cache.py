@@ -0,0 +1,70 @@
+# -*- coding:utf8 -*-
+"""
+The on-disk cache of checked programs.
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from interpreter.utils import cache
+from interpreter.utils.cache import ProgramCache
+from interpreter.interpreter.interpreter import Interpreter
+from tests.programs import FIB, write
+
+
+class TestProgramCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ProgramCache(os.path.join(self.directory.name, 'cache'))
+        self.fname = os.path.join(self.directory.name, 'test.nasm')
+        write(self.fname, FIB)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def age(self, key, seconds):
+        """ Sets the last use of the entry `key` `seconds` in the past. """
+        path = self.cache.path(key)
+        when = os.stat(path).st_mtime - seconds
+        os.utime(path, (when, when))
+
+    def test_program_is_reused(self):
+        with mock.patch.object(cache, 'front_end', wraps=cache.front_end) as front_end:
+            first = self.cache.program(self.fname, ['fib', 'main'])
+            second = self.cache.program(self.fname, ['fib', 'main'])
+        self.assertEqual(front_end.call_count, 1)
+        self.assertEqual(Interpreter([]).interpret(first), 55)
+        self.assertEqual(Interpreter([]).interpret(second), 55)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.put('a', [0] * 8)
+        self.cache.max_size = 2 * os.path.getsize(self.cache.path('a'))
+        self.cache.put('b', [1] * 8)
+        self.age('a', 20)
+        self.age('b', 10)
+        self.assertIsNotNone(self.cache.get('a'))
+        self.cache.put('c', [2] * 8)
+        self.assertEqual(self.cache.get('a'), [0] * 8)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), [2] * 8)
+
+    def test_format_change_invalidates(self):
+        key = ProgramCache.key(self.fname, ['fib', 'main'])
+        self.cache.program(self.fname, ['fib', 'main'])
+        with mock.patch.object(cache, 'CACHE_FORMAT', cache.CACHE_FORMAT + 1):
+            self.assertNotEqual(ProgramCache.key(self.fname, ['fib', 'main']), key)
+            with mock.patch.object(cache, 'front_end', wraps=cache.front_end) as front_end:
+                self.cache.program(self.fname, ['fib', 'main'])
+        self.assertEqual(front_end.call_count, 1)
+
+    def test_corrupted_entry_discarded(self):
+        with open(self.cache.path('a'), 'wb') as stream:
+            stream.write(b'not a tree')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertFalse(os.path.exists(self.cache.path('a')))
+
+
+if __name__ == '__main__':
+    unittest.main()
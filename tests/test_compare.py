@@ -0,0 +1,74 @@
+# -*- coding:utf8 -*-
+"""
+Signed comparisons and the conditional jumps reading them, in every mode.
+"""
+import unittest
+
+from interpreter.lexical_analysis.lexer import Lexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from interpreter.interpreter.interpreter import Interpreter, VISIT, CLOSURE, JIT_MODE
+
+HEADER = ["\n", "test:     format de fichier elf64-x86-64\n", "\n", "\n",
+          "Déassemblage de la section .text :\n", "\n"]
+
+
+def program(instructions):
+    """ The tree of a main function made of `instructions`, the label L
+    standing for the address of the first instruction after the jump.
+    """
+    lines = list(HEADER) + ["0000000000401000 <main>:\n"]
+    target = 0x401000 + 4 * (instructions.index('L:'))
+    pc = 0x401000
+    for text in instructions:
+        if text == 'L:':
+            continue
+        lines.append("  %x:\t%-21s\t%s\n" % (pc, "90", text.replace('L', '%x <main>' % target)))
+        pc += 4
+    lines.append("\n")
+    tree = Parser(Lexer(lines, ['main'])).parse()
+    SemanticAnalyzer.analyze(tree)
+    return tree
+
+
+def branch(setup, jump):
+    """ The instructions returning 7 if `jump` is taken after `setup`, 5
+    otherwise.
+    """
+    return setup + [jump + "    L", "mov    $0x5,%rax", "retq   ",
+                    "L:", "mov    $0x7,%rax", "retq   "]
+
+
+class TestSignedCompare(unittest.TestCase):
+
+    def check(self, instructions, expected):
+        for mode in [VISIT, CLOSURE, JIT_MODE]:
+            with self.subTest(mode=mode):
+                result = Interpreter([], mode=mode).interpret(program(instructions))
+                self.assertEqual(result, expected)
+
+    def test_negative_register(self):
+        minus_one = ["mov    $0x0,%rax", "sub    $0x1,%rax", "cmp    $0x0,%rax"]
+        self.check(branch(minus_one, "jl "), 7)
+        self.check(branch(minus_one, "jle"), 7)
+        self.check(branch(minus_one, "jg "), 5)
+        self.check(branch(minus_one, "jge"), 5)
+
+    def test_negative_immediate(self):
+        setup = ["mov    $0x0,%rax", "cmp    $0xffffffffffffffff,%rax"]
+        self.check(branch(setup, "jg "), 7)
+        self.check(branch(setup, "jl "), 5)
+
+    def test_negative_32_bits(self):
+        setup = ["mov    $0xfffffffe,%eax", "cmp    $0x1,%eax"]
+        self.check(branch(setup, "jl "), 7)
+        self.check(branch(setup, "jg "), 5)
+
+    def test_unsigned_values_still_ordered(self):
+        setup = ["mov    $0x3,%rax", "cmp    $0x2,%rax"]
+        self.check(branch(setup, "jg "), 7)
+        self.check(branch(setup, "jl "), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding:utf8 -*-
+"""
+Time travel through an execution, within and across checkpoints.
+"""
+import random
+import unittest
+
+from interpreter.interpreter.history import History
+from interpreter.interpreter.interpreter import Interpreter
+from tests.programs import FIB, address, tree
+
+INTERVAL = 16
+
+
+def state(history):
+    """ What a step must find again when it is moved to. """
+    memory = history.memory
+    pages = {number: bytes(page) for number, page in memory.stack.pages.items() if any(page)}
+    return (history.step, history.prog_counter, list(memory.registers._slots),
+            memory.cmp_reg, list(memory.call_stack), pages)
+
+
+class TestHistory(unittest.TestCase):
+
+    def history(self, break_points=()):
+        return History(Interpreter([]), tree(FIB), interval=INTERVAL,
+                       break_points=break_points)
+
+    def test_runs_to_the_end(self):
+        history = self.history()
+        self.assertEqual(history.continue_(), 3187)
+        self.assertEqual(history.result, 55)
+        self.assertIsNone(history.prog_counter)
+        self.assertEqual(history.forward(), 0)
+
+    def test_seek_finds_every_state_again(self):
+        history = self.history()
+        states = [state(history)]
+        while history.forward():
+            states.append(state(history))
+        steps = list(range(len(states)))
+        random.Random(0).shuffle(steps)
+        for step in steps[:200] + [0, len(states) - 1, 1, INTERVAL, INTERVAL - 1]:
+            history.seek(step)
+            self.assertEqual(state(history), states[step])
+
+    def test_back_within_and_across_checkpoints(self):
+        history = self.history()
+        history.forward(3 * INTERVAL + 5)
+        expected = state(history)
+        history.forward(2)
+        self.assertEqual(history.back(2), 2)
+        self.assertEqual(state(history), expected)
+        history.back(2 * INTERVAL)
+        self.assertEqual(history.step, INTERVAL + 5)
+        history.forward(2 * INTERVAL)
+        self.assertEqual(state(history), expected)
+
+    def test_breakpoints_stop_after_their_frame(self):
+        recurse = address(FIB, 'recurse')
+        history = self.history([recurse])
+        stops = []
+        while history.continue_():
+            if history.done:
+                break
+            stops.append(history.step)
+            history.back()
+            self.assertEqual(history.prog_counter, recurse)
+            history.forward()
+        self.assertEqual(len(stops), 88)
+        self.assertEqual(history.result, 55)
+        reversed_stops = []
+        while history.step:
+            reversed_stops.append(history.reverse_continue())
+        self.assertEqual(reversed_stops, stops[::-1] + [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
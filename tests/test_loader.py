@@ -0,0 +1,53 @@
+# -*- coding:utf8 -*-
+"""
+On-demand loading of the functions of a disassembly.
+"""
+import os
+import tempfile
+import unittest
+
+from interpreter.utils.loader import Loader
+from interpreter.semantic_analysis.analyzer import SemanticError
+from interpreter.interpreter.interpreter import Interpreter
+from tests.programs import FIB, address, write
+
+UNUSED = ('unused', ["mov    $0x1,%rax", "retq   "])
+
+
+class TestLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.directory.name, 'test.nasm')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def loader(self, functions):
+        write(self.fname, functions)
+        return Loader(self.fname)
+
+    def test_reachable_functions_only(self):
+        functions = [UNUSED] + FIB
+        loader = self.loader(functions)
+        program = loader.reachable('main')
+        self.assertEqual(sorted(loader.sections), ['fib', 'main'])
+        self.assertEqual(Interpreter([]).interpret(program), 55)
+        self.assertEqual(loader.name_at(address(functions, 'fib') + 4), 'fib')
+
+    def test_load_by_address(self):
+        functions = FIB + [UNUSED]
+        loader = self.loader(functions)
+        loader.reachable('main')
+        self.assertTrue(loader.load(address(functions, 'unused')))
+        self.assertIn('unused', loader.sections)
+        self.assertFalse(loader.load(0x1000))
+
+    def test_duplicate_section_name(self):
+        cold = ('main.cold', ["mov    $0x0,%rax", "retq   "])
+        with self.assertRaises(SemanticError):
+            self.loader(FIB + [cold])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# -*- coding:utf8 -*-
+"""
+The paged guest memory, the register views and the snapshots.
+"""
+import unittest
+
+from interpreter.interpreter.memory import Memory, PagedMemory, Registers, PAGE_SIZE
+
+M64 = 2**64
+
+
+class TestPagedMemory(unittest.TestCase):
+
+    def test_unwritten_memory_is_zero(self):
+        memory = PagedMemory()
+        self.assertEqual(memory.load(0x1234, 8), 0)
+        self.assertFalse(memory)
+
+    def test_sizes_are_little_endian(self):
+        memory = PagedMemory()
+        memory.store(0x100, 0x1122334455667788, 8)
+        self.assertEqual(memory.load(0x100, 1), 0x88)
+        self.assertEqual(memory.load(0x100, 2), 0x7788)
+        self.assertEqual(memory.load(0x104, 4), 0x11223344)
+        memory.store(0x100, 0x1ff, 1)
+        self.assertEqual(memory.load(0x100, 8), 0x11223344556677ff)
+
+    def test_across_page_boundary(self):
+        memory = PagedMemory()
+        address = PAGE_SIZE - 2
+        memory.store(address, 0x1122334455667788, 8)
+        self.assertEqual(sorted(memory.pages), [0, 1])
+        self.assertEqual(memory.load(address, 8), 0x1122334455667788)
+        self.assertEqual(memory.load(address, 2), 0x7788)
+        self.assertEqual(memory.load(PAGE_SIZE, 2), 0x5566)
+
+    def test_addresses_wrap_at_64_bits(self):
+        memory = PagedMemory()
+        memory.store(M64 - 4, 0x1122334455667788, 8)
+        self.assertEqual(memory.load(M64 - 4, 8), 0x1122334455667788)
+        self.assertEqual(memory.load(0, 4), 0x11223344)
+        self.assertEqual(memory.load(M64 + 0x10, 1), memory.load(0x10, 1))
+
+
+class TestRegisters(unittest.TestCase):
+
+    def setUp(self):
+        self.registers = Registers(0x7ff0, 0)
+        self.registers['rax'] = 0x1122334455667788
+
+    def test_high_byte_merges(self):
+        self.registers['ah'] = 0x1ff
+        self.assertEqual(self.registers['rax'], 0x112233445566ff88)
+        self.assertEqual(self.registers['ah'], 0xff)
+        self.assertEqual(self.registers['al'], 0x88)
+
+    def test_low_views_merge(self):
+        self.registers['ax'] = 0xabcd
+        self.registers['al'] = 0xef
+        self.assertEqual(self.registers['rax'], 0x112233445566abef)
+
+    def test_32_bits_write_zero_extends(self):
+        self.registers['eax'] = 0xdeadbeef
+        self.assertEqual(self.registers['rax'], 0xdeadbeef)
+        self.registers['r8'] = M64 - 1
+        self.registers['r8d'] = 1
+        self.assertEqual(self.registers['r8'], 1)
+
+    def test_64_bits_write_is_masked(self):
+        self.registers['rbx'] = -1
+        self.assertEqual(self.registers['rbx'], M64 - 1)
+        self.assertEqual(self.registers['ebx'], 2**32 - 1)
+
+
+class TestSnapshots(unittest.TestCase):
+
+    def test_writes_after_snapshot_are_isolated(self):
+        memory = PagedMemory()
+        memory.store(0x10, 1, 8)
+        snapshot = memory.snapshot()
+        memory.store(0x10, 2, 8)
+        snapshot.store(0x18, 3, 8)
+        self.assertEqual(snapshot.load(0x10, 8), 1)
+        self.assertEqual(memory.load(0x10, 8), 2)
+        self.assertEqual(memory.load(0x18, 8), 0)
+
+    def test_pages_shared_until_written(self):
+        memory = PagedMemory()
+        memory.store(0x10, 1, 8)
+        memory.store(PAGE_SIZE, 1, 8)
+        snapshot = memory.snapshot()
+        memory.store(0x10, 2, 8)
+        self.assertIsNot(memory.pages[0], snapshot.pages[0])
+        self.assertIs(memory.pages[1], snapshot.pages[1])
+
+    def test_restore_keeps_snapshot_intact(self):
+        memory = PagedMemory()
+        memory.store(0x10, 1, 8)
+        snapshot = memory.snapshot()
+        memory.store(0x10, 2, 8)
+        memory.restore(snapshot)
+        self.assertEqual(memory.load(0x10, 8), 1)
+        memory.store(0x10, 3, 8)
+        self.assertEqual(snapshot.load(0x10, 8), 1)
+        memory.restore(snapshot)
+        self.assertEqual(memory.load(0x10, 8), 1)
+
+    def test_machine_state(self):
+        memory = Memory()
+        memory.registers['rax'] = 1
+        memory.call_stack.append(4)
+        memory.push(5)
+        snapshot = memory.snapshot()
+        registers = memory.registers
+        memory.registers['rax'] = 2
+        memory.call_stack.append(6)
+        memory.push(7)
+        memory.restore(snapshot)
+        self.assertIs(memory.registers, registers)
+        self.assertEqual(memory.registers['rax'], 1)
+        self.assertEqual(memory.call_stack, [4])
+        self.assertEqual(memory.pop(), 5)
+        self.assertEqual(snapshot.registers['rax'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
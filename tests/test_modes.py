@@ -0,0 +1,88 @@
+# -*- coding:utf8 -*-
+"""
+The visitor, the closures and the JIT run the same programs to the same
+results, including across the cuts of long blocks and at breakpoints.
+"""
+import unittest
+from queue import Empty
+
+from interpreter.interpreter.interpreter import Interpreter, AsmQueue, VISIT, CLOSURE, JIT_MODE
+from interpreter.interpreter.jit import MAX_BLOCK
+from tests.programs import FIB, address, tree
+
+MODES = [VISIT, CLOSURE, JIT_MODE]
+
+STRAIGHT = [('main', ["mov    $0x0,%rax"] + ["add    $0x1,%rax"] * 69 +
+             ["middle:"] + ["add    $0x1,%rax"] * 81 + ["retq   "])]
+
+LOOP = [('main', ["mov    $0x0,%rax", "mov    $0x5,%rcx",
+                  "loop:", "add    %rcx,%rax", "sub    $0x1,%rcx",
+                  "cmp    $0x0,%rcx", "jg     {loop}", "retq   "])]
+
+
+def posted():
+    """ The addresses and rax values posted by the traps since the last call. """
+    stops = []
+    while True:
+        try:
+            prog_counter, memory = AsmQueue.get_nowait()
+        except Empty:
+            return stops
+        stops.append((prog_counter, memory.registers['rax']))
+
+
+class TestModes(unittest.TestCase):
+
+    def setUp(self):
+        posted()
+
+    def run_modes(self, functions, break_points=()):
+        """ Maps every mode to the result, the number of frames executed and
+        the traps posted when running `functions`.
+        """
+        runs = {}
+        for mode in MODES:
+            interpreter = Interpreter(break_points, mode=mode, counting=True)
+            result = interpreter.interpret(tree(functions))
+            runs[mode] = (result, interpreter.executed, posted())
+        return runs
+
+    def test_recursion(self):
+        runs = self.run_modes(FIB)
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertEqual(runs[mode], (55, 3188, []))
+
+    def test_loop(self):
+        runs = self.run_modes(LOOP)
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertEqual(runs[mode], (15, 23, []))
+
+    def test_long_block_cut(self):
+        runs = self.run_modes(STRAIGHT)
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertEqual(runs[mode], (150, 152, []))
+        interpreter = Interpreter([], mode=JIT_MODE)
+        interpreter.interpret(tree(STRAIGHT))
+        self.assertEqual(max(interpreter.weights), MAX_BLOCK)
+
+    def test_breakpoint_inside_block(self):
+        middle = address(STRAIGHT, 'middle')
+        runs = self.run_modes(STRAIGHT, [middle])
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertEqual(runs[mode], (150, 152, [(middle, 70)]))
+
+    def test_breakpoint_in_loop(self):
+        loop = address(LOOP, 'loop')
+        runs = self.run_modes(LOOP, [loop])
+        expected = [(loop, 5), (loop, 9), (loop, 12), (loop, 14), (loop, 15)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertEqual(runs[mode], (15, 23, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding:utf8 -*-
+"""
+Debugging sessions driven by asyncio.
+"""
+import asyncio
+import unittest
+
+from interpreter.interpreter.session import DebugSession, EVENTS, STEP, ERROR
+from interpreter.interpreter.interpreter import BREAKPOINT, UNTIL, END
+from tests.programs import FIB, address, tree
+
+RECURSE = address(FIB, 'recurse')
+
+
+def run(coroutine):
+    """ Runs `coroutine` in a new event loop, started after the sessions. """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestDebugSession(unittest.TestCase):
+
+    def session(self, break_points=(), slice_size=7):
+        return DebugSession(tree(FIB), break_points=break_points, slice_size=slice_size)
+
+    def test_steps(self):
+        session = self.session()
+        async def steps():
+            return [await session.step(), await session.step(20)]
+        first, second = run(steps())
+        self.assertEqual((first.reason, first.executed), (STEP, 1))
+        self.assertEqual((second.reason, second.executed), (STEP, 21))
+        self.assertEqual(second.prog_counter, session.prog_counter)
+
+    def test_breakpoint_stops_after_its_frame(self):
+        session = self.session([RECURSE])
+        event = run(session.continue_())
+        self.assertEqual(event.reason, BREAKPOINT)
+        self.assertEqual(event.prog_counter, RECURSE + 4)
+
+    def test_run_until_stops_before_its_frame(self):
+        session = self.session()
+        event = run(session.run_until(RECURSE))
+        self.assertEqual((event.reason, event.prog_counter), (UNTIL, RECURSE))
+        with self.assertRaises(ValueError):
+            run(session.run_until(0x1))
+
+    def test_runs_to_the_end(self):
+        session = self.session([RECURSE])
+        async def finish():
+            session.break_points.clear()
+            return await session.continue_(), await session.step()
+        event, again = run(finish())
+        self.assertEqual((event.reason, event.executed, event.result), (END, 3188, 55))
+        self.assertIs(again, event)
+        self.assertIsNone(session.prog_counter)
+
+    def test_events(self):
+        session = self.session([RECURSE])
+        async def watch():
+            events = []
+            async def collect():
+                async for event in session.events():
+                    events.append(event)
+            watcher = asyncio.ensure_future(collect())
+            while not session.finished:
+                await session.continue_()
+            await watcher
+            return events
+        events = run(watch())
+        self.assertEqual(len(events), 89)
+        self.assertEqual(events[-1].reason, END)
+
+    def test_events_bounded_without_consumer(self):
+        session = self.session()
+        async def steps():
+            for _ in range(EVENTS + 10):
+                await session.step()
+        run(steps())
+        self.assertEqual(session.queue.qsize(), EVENTS)
+        self.assertEqual(session.queue.get_nowait().executed, 11)
+
+    def test_error(self):
+        session = self.session()
+        interpreter = session.interpreter
+        interpreter.code[interpreter.index + 3] = lambda: 1 / 0
+        event = run(session.continue_())
+        self.assertEqual((event.reason, event.executed), (ERROR, 3))
+        self.assertIsInstance(event.error, ZeroDivisionError)
+        self.assertTrue(session.finished)
+
+    def test_concurrent_sessions(self):
+        sessions = [self.session(slice_size=100) for _ in range(10)]
+        async def all_sessions():
+            return await asyncio.gather(*[session.continue_() for session in sessions])
+        events = run(all_sessions())
+        self.assertEqual({(event.reason, event.result) for event in events}, {(END, 55)})
+
+
+if __name__ == '__main__':
+    unittest.main()